@@ -32,6 +32,8 @@ from backtests.portfolio_backtest import (
     final_metrics,
     run_portfolio_backtest,
 )
+from investment_system.common.trading_calendar import rebalance_mask
+from investment_system.features.cross_sectional import cross_sectional_rank, date_codes
 from investment_system.features.price_features import add_price_features
 from investment_system.strategies.baseline import (
     add_baseline_position,
@@ -58,6 +60,7 @@ FEATURE_SET_MODE = "momentum_plus_high"
 FEE_BPS = 0
 BASELINE_HOLDING_PERIOD = HORIZON
 ROLLING_WINDOWS = (20, 60, 120, 180, 252)
+FEATURE_DTYPE = "float64"  # albo "float32"
 BASELINE_FAST_WINDOW = min(ROLLING_WINDOWS)
 BASELINE_SIGNAL_WINDOW = max(ROLLING_WINDOWS)
 FEATURE_BUCKET_COLS = []
@@ -252,6 +255,19 @@ def build_feature_cols(windows: tuple[int, ...], mode: str) -> list[str]:
 
 FEATURE_COLS = build_feature_cols(ROLLING_WINDOWS, mode=FEATURE_SET_MODE)
 FEATURE_COLS.append("sentiment_score")
+# tylko te kolumny sa liczone (razem z ich zaleznosciami z feature_graph)
+DATASET_COLS = list(
+    dict.fromkeys(
+        FEATURE_COLS
+        + FEATURE_BUCKET_COLS
+        + [
+            f"px_log_return_mean_{BASELINE_FAST_WINDOW}",
+            f"px_log_return_mean_{BASELINE_SIGNAL_WINDOW}",
+            f"px_log_return_volatility_{BASELINE_SIGNAL_WINDOW}",
+            f"px_log_return_ratio_{BASELINE_SIGNAL_WINDOW}",
+        ]
+    )
+)
 
 
 def target_col_name(horizon: int) -> str:
@@ -450,7 +466,9 @@ def add_baseline_signal_with_train_threshold(
         * df_all[fast_mean_col]
         / (df_all[signal_volatility_col] + 1e-12)
     )
-    df_all["rank"] = df_all.groupby("date")["score"].rank(ascending=False)
+    df_all["rank"] = cross_sectional_rank(
+        df_all["score"], date_codes(df_all["date"]), ascending=False
+    )
 
     ratio = df_all[signal_ratio_col].replace([np.inf, -np.inf], np.nan)
     threshold = ratio[df_all["date"] <= train_end_dt].quantile(0.70)
@@ -462,9 +480,7 @@ def add_baseline_signal_with_train_threshold(
         & (df_all["rank"] <= top_k)
     )
 
-    dates = pd.Series(df_all["date"].drop_duplicates().sort_values().to_numpy())
-    rebalance_dates = set(dates.iloc[::holding_period])
-    df_all["rebalance_day"] = df_all["date"].isin(rebalance_dates)
+    df_all["rebalance_day"] = rebalance_mask(df_all["date"], holding_period)
 
     df_all["signal_decision"] = np.where(
         df_all["rebalance_day"],
@@ -473,7 +489,7 @@ def add_baseline_signal_with_train_threshold(
     )
     df_all = df_all.sort_values(["symbol", "date"]).reset_index(drop=True)
     df_all["signal_hold"] = (
-        df_all.groupby("symbol")["signal_decision"].ffill().fillna(0)
+        df_all.groupby("symbol", observed=True)["signal_decision"].ffill().fillna(0)
     )
     df_all = add_baseline_position(df_all)
     df_all = add_equal_weight_from_position(df_all)
@@ -657,6 +673,7 @@ def save_results(
                 "parameter": "ROLLING_WINDOWS",
                 "value": ",".join(map(str, ROLLING_WINDOWS)),
             },
+            {"parameter": "FEATURE_DTYPE", "value": FEATURE_DTYPE},
             {"parameter": "BASELINE_FAST_WINDOW", "value": BASELINE_FAST_WINDOW},
             {"parameter": "BASELINE_SIGNAL_WINDOW", "value": BASELINE_SIGNAL_WINDOW},
             {"parameter": "FEATURE_COLS", "value": ", ".join(FEATURE_COLS)},
@@ -841,7 +858,12 @@ def main() -> None:
     prices_path = ROOT / "data" / "raw" / "prices.parquet"
     sentiment_path = ROOT / "data" / "processed" / "sentiment_data.parquet"
     df = make_dataset_from_parquet(
-        prices_path, sentiment_path, ROLLING_WINDOWS, HORIZON
+        prices_path,
+        sentiment_path,
+        ROLLING_WINDOWS,
+        HORIZON,
+        dtype=FEATURE_DTYPE,
+        columns=DATASET_COLS,
     )
 
     models = {
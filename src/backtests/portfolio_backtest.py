@@ -14,7 +14,7 @@ def add_n_active(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def add_turnover(df: pd.DataFrame) -> pd.DataFrame:
-    df["prev_weight"] = df.groupby("symbol")["weight"].shift().fillna(0)
+    df["prev_weight"] = df.groupby("symbol", observed=True)["weight"].shift().fillna(0)
     df["daily_weight_diff"] = np.abs(df["weight"] - df["prev_weight"])
     df["turnover"] = df.groupby("date")["daily_weight_diff"].transform("sum")
 
@@ -0,0 +1,20 @@
+import random
+
+import requests
+
+
+def pooled_session(pool_size: int = 16) -> requests.Session:
+    """One session with a connection pool large enough for every worker."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def full_jitter(attempt: int, backoff: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Retry delay uniform in [0, min(backoff * 2**attempt, cap)], so parallel
+    workers do not retry in lockstep.
+    """
+    return random.uniform(0, min(backoff * 2**attempt, cap))
@@ -0,0 +1,118 @@
+"""
+Trading-day calendars and a dense (date x symbol) price panel.
+
+A calendar is the sorted DatetimeIndex of days on which a market traded,
+built once from the long (symbol, date) frame; a date's position in it is a
+hash lookup. price_panel turns the long frame into 2-D arrays aligned on a
+calendar, with a mask of the (date, symbol) cells that have a row.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class PricePanel(NamedTuple):
+    dates: pd.DatetimeIndex
+    symbols: pd.Index
+    mask: np.ndarray
+    values: dict[str, np.ndarray]
+
+
+def trading_calendar(dates: pd.Series) -> pd.DatetimeIndex:
+    """Sorted unique trading days of a date column."""
+    # hash-based unique first, so only the (small) set of days is sorted
+    days = pd.unique(pd.to_datetime(dates).dropna().to_numpy())
+    return pd.DatetimeIndex(np.sort(days), name="date")
+
+
+def market_calendars(df: pd.DataFrame) -> dict[str, pd.DatetimeIndex]:
+    """
+    One calendar per market (e.g. "us", "pl"): the days on which at least
+    one symbol of that market has a row.
+    """
+    if "market" not in df.columns:
+        raise KeyError("Missing column: market")
+    markets, market_codes = np.unique(df["market"].astype(str), return_inverse=True)
+    dates = df["date"].to_numpy()
+    return {
+        market: trading_calendar(pd.Series(dates[market_codes == i]))
+        for i, market in enumerate(markets)
+    }
+
+
+def calendar_positions(calendar: pd.DatetimeIndex, dates: pd.Series) -> np.ndarray:
+    """Position of every date in the calendar (-1 for days not in it)."""
+    return calendar.get_indexer(pd.DatetimeIndex(dates))
+
+
+def rebalance_mask(
+    dates: pd.Series,
+    holding_period: int,
+    calendar: pd.DatetimeIndex | None = None,
+) -> np.ndarray:
+    """
+    True on every holding_period-th trading day of the calendar, starting
+    with its first day. The calendar defaults to the days of `dates`; pass a
+    prebuilt one to skip rebuilding it on every call.
+    """
+    if holding_period <= 0:
+        raise ValueError("holding_period must be greater than 0.")
+    if calendar is None:
+        calendar = trading_calendar(dates)
+    position = calendar_positions(calendar, dates)
+    return (position >= 0) & (position % holding_period == 0)
+
+
+def price_panel(
+    df: pd.DataFrame,
+    columns: list[str],
+    calendar: pd.DatetimeIndex | None = None,
+    dtype: str = "float64",
+) -> PricePanel:
+    """
+    Dense (date x symbol) arrays of `columns` aligned on the calendar
+    (default: all days of df). Cells without a row are NaN and False in
+    mask; rows on days outside the calendar are dropped.
+    """
+    missing = {"symbol", "date", *columns} - set(df.columns)
+    if missing:
+        raise KeyError(f"Missing columns: {missing}")
+    if calendar is None:
+        calendar = trading_calendar(df["date"])
+
+    symbol_codes, symbols = pd.factorize(df["symbol"], sort=True)
+    date_rows = calendar_positions(calendar, df["date"])
+    keep = (date_rows >= 0) & (symbol_codes >= 0)
+    date_rows, symbol_codes = date_rows[keep], symbol_codes[keep]
+
+    shape = (len(calendar), len(symbols))
+    cells = np.ravel_multi_index((date_rows, symbol_codes), shape)
+    mask = np.zeros(shape, dtype=bool)
+    mask.flat[cells] = True
+    if mask.sum() != len(cells):
+        raise ValueError("Duplicate (symbol, date) pairs found")
+
+    values = {}
+    for col in columns:
+        panel = np.full(shape, np.nan, dtype=dtype)
+        panel.flat[cells] = df[col].to_numpy(dtype=dtype)[keep]
+        values[col] = panel
+    return PricePanel(calendar, pd.Index(symbols, name="symbol"), mask, values)
+
+
+def panel_to_frame(panel: PricePanel, columns: list[str] | None = None) -> pd.DataFrame:
+    """Long (symbol, date) frame of the masked cells, sorted by (symbol, date)."""
+    columns = list(panel.values) if columns is None else columns
+    # transpose so that the row-major cell order is (symbol, date)
+    date_rows, symbol_codes = np.nonzero(panel.mask.T)[::-1]
+    df = pd.DataFrame(
+        {
+            "symbol": panel.symbols[symbol_codes],
+            "date": panel.dates[date_rows],
+        }
+    )
+    for col in columns:
+        df[col] = panel.values[col][date_rows, symbol_codes]
+    return df
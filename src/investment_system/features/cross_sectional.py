@@ -0,0 +1,136 @@
+import pandas as pd
+import numpy as np
+
+CROSS_SECTIONAL_TRANSFORMS = ("rank", "pct", "zscore", "demean")
+
+
+def date_codes(dates: pd.Series) -> np.ndarray:
+    """
+    Factorizes the date column once; the codes are reused by every
+    cross-sectional kernel. Missing dates get code -1 (and NaN results).
+    """
+    return pd.factorize(dates)[0]
+
+
+def _valid(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    return ~np.isnan(values) & (codes >= 0)
+
+
+def _per_date(values: np.ndarray, codes: np.ndarray) -> tuple[np.ndarray, ...]:
+    """Per-row count, mean and population std of the valid values of its date."""
+    valid = _valid(values, codes)
+    group = np.where(codes >= 0, codes, 0)
+    n_dates = int(group.max()) + 1 if len(group) else 0
+    x = np.where(valid, values, 0.0)
+    count = np.bincount(group, weights=valid, minlength=n_dates)
+    total = np.bincount(group, weights=x, minlength=n_dates)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+    deviation = np.where(valid, x - mean[group], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.bincount(group, weights=deviation**2, minlength=n_dates) / count
+    std = np.sqrt(variance)
+    return count[group], mean[group], std[group]
+
+
+def cross_sectional_rank(
+    values: np.ndarray,
+    codes: np.ndarray,
+    ascending: bool = True,
+    pct: bool = False,
+) -> np.ndarray:
+    """
+    Per-date rank of values, equal to groupby(date).rank(method="average")
+    (NaN stays NaN). One sort by (date, value) instead of a groupby pass;
+    ties get the average of their positions.
+    """
+    values = np.asarray(values, dtype="float64")
+    codes = np.asarray(codes)
+    n = len(values)
+    valid = _valid(values, codes)
+    ranks = np.full(n, np.nan)
+    if not valid.any():
+        return ranks
+
+    # sort by value, then stably by date code (a radix sort for < 2**16
+    # dates); the order of equal values does not matter for average ranks
+    rows = np.flatnonzero(valid)
+    order = rows[np.argsort(values[rows])]
+    code_dtype = "uint16" if codes.max() < 1 << 16 else "int64"
+    order = order[np.argsort(codes[order].astype(code_dtype), kind="stable")]
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+    m = len(order)
+    index = np.arange(m)
+
+    new_date = np.ones(m, dtype=bool)
+    new_date[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    date_start = np.maximum.accumulate(np.where(new_date, index, 0))
+
+    new_tie = new_date.copy()
+    new_tie[1:] |= sorted_values[1:] != sorted_values[:-1]
+    tie_first = np.flatnonzero(new_tie)
+    tie_last = np.append(tie_first[1:], m) - 1
+    tie = np.cumsum(new_tie) - 1
+    sorted_ranks = (tie_first[tie] + tie_last[tie]) / 2 - date_start + 1
+
+    count = np.bincount(sorted_codes)[sorted_codes]
+    if not ascending:
+        sorted_ranks = count + 1 - sorted_ranks
+    if pct:
+        sorted_ranks = sorted_ranks / count
+    ranks[order] = sorted_ranks
+    return ranks
+
+
+def cross_sectional_demean(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """values minus their per-date mean (groupby(date).transform("mean"))."""
+    values = np.asarray(values, dtype="float64")
+    _, mean, _ = _per_date(values, codes)
+    return np.where(_valid(values, codes), values - mean, np.nan)
+
+
+def cross_sectional_zscore(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """
+    (values - per-date mean) / per-date population std (ddof=0). Dates
+    with zero dispersion give NaN.
+    """
+    values = np.asarray(values, dtype="float64")
+    _, mean, std = _per_date(values, codes)
+    deviation = np.where(_valid(values, codes), values - mean, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, deviation / std, np.nan)
+
+
+def add_cross_sectional_features(
+    df: pd.DataFrame,
+    columns: list[str],
+    transforms: tuple[str, ...] = CROSS_SECTIONAL_TRANSFORMS,
+    date_column: str = "date",
+) -> pd.DataFrame:
+    """
+    Adds {column}_cs_{transform} for every column and transform
+    (rank, pct, zscore, demean), with dates factorized once for all of them.
+    """
+    unknown = set(transforms) - set(CROSS_SECTIONAL_TRANSFORMS)
+    if unknown:
+        raise ValueError(
+            f"transforms must be in {CROSS_SECTIONAL_TRANSFORMS}, got: {sorted(unknown)}"
+        )
+    codes = date_codes(df[date_column])
+    for col in columns:
+        values = df[col].to_numpy(dtype="float64")
+        count, mean, std = _per_date(values, codes)
+        deviation = np.where(_valid(values, codes), values - mean, np.nan)
+        if "rank" in transforms or "pct" in transforms:
+            ranks = cross_sectional_rank(values, codes)
+        if "rank" in transforms:
+            df[f"{col}_cs_rank"] = ranks
+        if "pct" in transforms:
+            df[f"{col}_cs_pct"] = ranks / count
+        if "zscore" in transforms:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                df[f"{col}_cs_zscore"] = np.where(std > 0, deviation / std, np.nan)
+        if "demean" in transforms:
+            df[f"{col}_cs_demean"] = deviation
+    return df
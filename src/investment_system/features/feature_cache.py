@@ -0,0 +1,142 @@
+"""
+On-disk cache of price feature columns.
+
+An entry is keyed by a content hash of the sorted symbol/date/close data, the
+window tuple, the storage dtype, the validate mode and FEATURE_CODE_VERSION (a
+hash of the feature code), and holds one .npy file per column. A run loads only the
+columns it requests and computes only the ones that are not cached yet.
+Entries are evicted least recently used first once the cache exceeds
+max_bytes.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import investment_system.features.price_features as pf
+from investment_system.common.paths import PROCESSED_DIR
+
+FEATURE_CACHE_DIR = PROCESSED_DIR / "feature_cache"
+FEATURE_CACHE_MAX_BYTES = 4 * 1024**3
+KEY_COLUMNS = ["symbol", "date", "close"]
+FEATURE_CODE_FILES = ("price_features.py", "feature_graph.py")
+
+
+def feature_code_version() -> str:
+    """Hash of the feature code; any change to it invalidates the cache."""
+    digest = hashlib.sha256()
+    for name in FEATURE_CODE_FILES:
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+FEATURE_CODE_VERSION = feature_code_version()
+
+
+def feature_cache_key(
+    df: pd.DataFrame, windows: tuple[int, ...], dtype: str, validate: str
+) -> str:
+    """
+    Content hash of a frame sorted by (symbol, date) and feature settings.
+    validate is part of the key, so a validated run never reads columns
+    that were written without validation.
+    """
+    digest = hashlib.sha256()
+    row_hashes = pd.util.hash_pandas_object(df[KEY_COLUMNS], index=False)
+    digest.update(row_hashes.to_numpy().tobytes())
+    settings = (tuple(windows), dtype, validate, FEATURE_CODE_VERSION)
+    digest.update(repr(settings).encode())
+    return digest.hexdigest()[:32]
+
+
+def _column_path(entry: Path, column: str) -> Path:
+    return entry / f"{column}.npy"
+
+
+def _write_column(entry: Path, column: str, values: np.ndarray) -> None:
+    # unique temp file, so concurrent runs writing the same entry never
+    # replace each other's half-written column
+    with tempfile.NamedTemporaryFile(
+        dir=entry, prefix=f"{column}.", suffix=".tmp", delete=False
+    ) as tmp:
+        np.save(tmp, values)
+    os.replace(tmp.name, _column_path(entry, column))
+
+
+def evict_feature_cache(
+    cache_dir: Path, max_bytes: int, keep: Path | None = None
+) -> list[Path]:
+    """
+    Removes least recently used entries (oldest mtime first) until the cache
+    fits in max_bytes. `keep` is never removed. Returns removed entries.
+    """
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return []
+    entries = [path for path in cache_dir.iterdir() if path.is_dir()]
+    sizes = {
+        entry: sum(path.stat().st_size for path in entry.iterdir()) for entry in entries
+    }
+    total = sum(sizes.values())
+    removed = []
+    for entry in sorted(entries, key=lambda path: path.stat().st_mtime):
+        if total <= max_bytes:
+            break
+        if entry == keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= sizes[entry]
+        removed.append(entry)
+    return removed
+
+
+def cached_price_features(
+    data: pd.DataFrame,
+    windows: tuple[int, ...],
+    inplace: bool = False,
+    validate: str = "full",
+    dtype: str = "float64",
+    keep_intermediates: bool = True,
+    columns: list[str] | None = None,
+    n_jobs: int = 1,
+    cache_dir: Path = FEATURE_CACHE_DIR,
+    max_bytes: int = FEATURE_CACHE_MAX_BYTES,
+) -> pd.DataFrame:
+    """
+    add_price_features backed by the feature cache: same arguments and
+    result. Only columns missing from the cache entry are computed (and
+    validated); they are stored for the next run.
+    """
+    pf.validate_data(data)
+    output = pf.output_columns(windows, keep_intermediates, columns)
+    df = pf.feature_frame(data, inplace=inplace)
+
+    entry = Path(cache_dir) / feature_cache_key(df, windows, dtype, validate)
+    entry.mkdir(parents=True, exist_ok=True)
+    missing = [col for col in output if not _column_path(entry, col).exists()]
+    computed = None
+    if missing:
+        computed = pf.add_price_features(
+            df,
+            windows,
+            validate=validate,
+            dtype=dtype,
+            columns=missing,
+            n_jobs=n_jobs,
+        )
+        for col in missing:
+            _write_column(entry, col, computed[col].to_numpy())
+        evict_feature_cache(cache_dir, max_bytes, keep=entry)
+    os.utime(entry)
+
+    for col in output:
+        if col in missing:
+            df[col] = computed[col]
+        else:
+            df[col] = np.load(_column_path(entry, col))
+    return df
@@ -0,0 +1,63 @@
+"""
+Declarative feature registry.
+
+Every node of FEATURE_GRAPH (an output column or a shared kernel result)
+declares the nodes it is computed from; "{w}" stands for a rolling window.
+SOURCE_NODES are read from the input data and have no inputs. Asking for a
+subset of columns resolves only the part of the graph they depend on, so e.g.
+distance_from_high_* never pulls in the log-return moments.
+"""
+
+FEATURE_GRAPH: dict[str, tuple[str, ...]] = {
+    "log_return": ("close",),
+    # rolling mean and volatility share one running-sum kernel
+    "log_return_moments_{w}": ("log_return",),
+    "px_log_return_mean_{w}": ("log_return_moments_{w}",),
+    "px_log_return_volatility_{w}": ("log_return_moments_{w}",),
+    "px_log_return_ratio_{w}": (
+        "px_log_return_mean_{w}",
+        "px_log_return_volatility_{w}",
+    ),
+    "rolling_high_{w}_close": ("close",),
+    "distance_from_high_{w}": ("close", "rolling_high_{w}_close"),
+    "rolling_min_{w}_close": ("close",),
+    "distance_from_min_{w}": ("close", "rolling_min_{w}_close"),
+    "sentiment_score": ("sentiment_data",),
+}
+SOURCE_NODES = ("close", "sentiment_data")
+
+
+def feature_graph(windows: tuple[int, ...]) -> dict[str, tuple[str, ...]]:
+    """FEATURE_GRAPH with "{w}" expanded for every window."""
+    graph = {node: () for node in SOURCE_NODES}
+    for node, inputs in FEATURE_GRAPH.items():
+        node_windows = windows if "{w}" in node else (None,)
+        for window in node_windows:
+            graph[node.format(w=window)] = tuple(
+                name.format(w=window) for name in inputs
+            )
+    return graph
+
+
+def resolve_features(columns: list[str], windows: tuple[int, ...]) -> list[str]:
+    """
+    Nodes needed to compute `columns` (the columns themselves included),
+    each listed after all of its inputs. Raises KeyError for unknown columns.
+    """
+    graph = feature_graph(windows)
+    unknown = [col for col in columns if col not in graph]
+    if unknown:
+        raise KeyError(f"Unknown feature columns: {unknown}")
+
+    resolved: dict[str, None] = {}
+
+    def visit(node: str) -> None:
+        if node in resolved:
+            return
+        for name in graph[node]:
+            visit(name)
+        resolved[node] = None
+
+    for col in columns:
+        visit(col)
+    return list(resolved)
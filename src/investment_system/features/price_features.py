@@ -1,11 +1,52 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from investment_system.features.feature_graph import resolve_features
+
+
+def is_sorted(df: pd.DataFrame, sorted_columns: list[str] = ["symbol", "date"]) -> bool:
+    """
+    Checks in one vectorized pass over adjacent rows whether the frame is
+    already ordered by sorted_columns (lexicographically, ascending).
+    Categoricals with sorted categories are compared by their codes.
+    """
+    undecided = np.ones(max(len(df) - 1, 0), dtype=bool)
+    for col in sorted_columns:
+        values = df[col]
+        if (
+            isinstance(values.dtype, pd.CategoricalDtype)
+            and values.cat.categories.is_monotonic_increasing
+        ):
+            values = values.cat.codes.to_numpy()
+        else:
+            values = values.to_numpy()
+        prev, current = values[:-1], values[1:]
+        if (undecided & (current < prev)).any():
+            return False
+        undecided &= current == prev
+    return True
+
+
+def _has_default_index(df: pd.DataFrame) -> bool:
+    return df.index.equals(pd.RangeIndex(len(df)))
+
 
 def sort_data(
     df: pd.DataFrame, sorted_columns: list[str] = ["symbol", "date"]
 ) -> pd.DataFrame:
+    """
+    Sorts by sorted_columns and resets the index. Frames that are already
+    sorted with a default index are returned as they are, without a copy.
+    """
+    if is_sorted(df, sorted_columns):
+        if _has_default_index(df):
+            return df
+        return df.reset_index(drop=True)
     return df.sort_values(sorted_columns).reset_index(drop=True)
 
 
@@ -69,65 +110,121 @@ def add_px_log_return_ratio(df: pd.DataFrame, window: int) -> pd.DataFrame:
     return df
 
 
-def add_distance_from_high(df: pd.DataFrame, window: int) -> pd.DataFrame:
-    eps = 1e-12
-    df = df.sort_values(["symbol", "date"])
-    df[f"rolling_high_{str(window)}_close"] = (
-        df.groupby("symbol")["close"]
-        .rolling(window=window)
-        .max()
-        .reset_index(level=0, drop=True)
-    )
-    df[f"distance_from_high_{str(window)}"] = np.log(
-        df["close"] / df[f"rolling_high_{str(window)}_close"]
+DISTANCE_EPS = 1e-12
+VALIDATE_MODES = ("full", "sample", "off")
+VALIDATE_SAMPLE_SIZE = 10_000
+_CHECK_CHUNK = 1 << 16
+
+
+def _distance_violation(
+    close: np.ndarray, extreme: np.ndarray, distance: np.ndarray, upper: bool
+) -> int | None:
+    """
+    Fused check of the three distance invariants (close vs rolling extreme,
+    sign of the distance, zero distance at the extreme). Evaluated chunk by
+    chunk so temporaries stay small; returns the first violating row.
+    """
+    eps = DISTANCE_EPS
+    for start in range(0, len(close), _CHECK_CHUNK):
+        stop = start + _CHECK_CHUNK
+        c, e, d = close[start:stop], extreme[start:stop], distance[start:stop]
+        if upper:
+            bad = (c > e) | (d > eps) | ((c == e) & (d < -eps))
+        else:
+            bad = (c < e) | (d < -eps) | ((c == e) & (d > eps))
+        if bad.any():
+            return start + int(np.argmax(bad))
+    return None
+
+
+def _sample_rows(n: int, validate: str) -> np.ndarray | None:
+    if validate == "sample" and n > VALIDATE_SAMPLE_SIZE:
+        rng = np.random.default_rng(0)
+        return np.sort(rng.choice(n, size=VALIDATE_SAMPLE_SIZE, replace=False))
+    return None
+
+
+def _check_distance_from_high(
+    close, rolling_high, distance, window: int, rows: np.ndarray | None = None
+) -> None:
+    close, rolling_high, distance = (
+        np.asarray(x, dtype="float64") for x in (close, rolling_high, distance)
     )
+    if rows is not None:
+        close, rolling_high, distance = close[rows], rolling_high[rows], distance[rows]
 
-    if (df["close"] > df[f"rolling_high_{str(window)}_close"]).any():
+    i = _distance_violation(close, rolling_high, distance, upper=True)
+    if i is None:
+        return
+    if close[i] > rolling_high[i]:
         raise ValueError("Column 'close' canot be greater than rolling high ")
-    if ((df[f"distance_from_high_{str(window)}"]) > eps).any():
+    if distance[i] > DISTANCE_EPS:
         raise ValueError(
             f"Column distance_from_high_{str(window)} canot be greater than 0"
         )
-
-    mask = (df["close"] == df[f"rolling_high_{str(window)}_close"]) & (
-        abs(df[f"distance_from_high_{str(window)}"]) > eps
+    raise ValueError(
+        f"Column distance_from_high_{str(window)} must be equal 0 when close is equal rolling_high"
     )
 
-    if mask.any():
-        raise ValueError(
-            f"Column distance_from_high_{str(window)} must be equal 0 when close is equal rolling_high"
-        )
+
+def add_distance_from_high(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    if not is_sorted(df, ["symbol", "date"]):
+        df = df.sort_values(["symbol", "date"])
+    _, position = symbol_blocks(df["symbol"])
+    df[f"rolling_high_{str(window)}_close"] = rolling_extrema(
+        df["close"].to_numpy(), position, (window,), np.maximum
+    )[window]
+    df[f"distance_from_high_{str(window)}"] = np.log(
+        df["close"] / df[f"rolling_high_{str(window)}_close"]
+    )
+    _check_distance_from_high(
+        df["close"],
+        df[f"rolling_high_{str(window)}_close"],
+        df[f"distance_from_high_{str(window)}"],
+        window,
+    )
     return df
 
 
-def add_distance_from_low(df: pd.DataFrame, window: int) -> pd.DataFrame:
-    eps = 1e-12
-    df = df.sort_values(["symbol", "date"])
-    df[f"rolling_min_{str(window)}_close"] = (
-        df.groupby("symbol")["close"]
-        .rolling(window=window)
-        .min()
-        .reset_index(level=0, drop=True)
-    )
-    df[f"distance_from_min_{str(window)}"] = np.log(
-        df["close"] / df[f"rolling_min_{str(window)}_close"]
+def _check_distance_from_low(
+    close, rolling_min, distance, window: int, rows: np.ndarray | None = None
+) -> None:
+    close, rolling_min, distance = (
+        np.asarray(x, dtype="float64") for x in (close, rolling_min, distance)
     )
+    if rows is not None:
+        close, rolling_min, distance = close[rows], rolling_min[rows], distance[rows]
 
-    if (df["close"] < df[f"rolling_min_{str(window)}_close"]).any():
+    i = _distance_violation(close, rolling_min, distance, upper=False)
+    if i is None:
+        return
+    if close[i] < rolling_min[i]:
         raise ValueError("Column 'close' canot be lower than rolling min ")
-    if ((df[f"distance_from_min_{str(window)}"]) < -eps).any():
+    if distance[i] < -DISTANCE_EPS:
         raise ValueError(
             f"Column distance_from_min_{str(window)} canot be lower than 0"
         )
-
-    mask = (df["close"] == df[f"rolling_min_{str(window)}_close"]) & (
-        abs(df[f"distance_from_min_{str(window)}"]) > eps
+    raise ValueError(
+        f"Column distance_from_min_{str(window)} must be equal 0 when close is equal rolling_min"
     )
 
-    if mask.any():
-        raise ValueError(
-            f"Column distance_from_min_{str(window)} must be equal 0 when close is equal rolling_min"
-        )
+
+def add_distance_from_low(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    if not is_sorted(df, ["symbol", "date"]):
+        df = df.sort_values(["symbol", "date"])
+    _, position = symbol_blocks(df["symbol"])
+    df[f"rolling_min_{str(window)}_close"] = rolling_extrema(
+        df["close"].to_numpy(), position, (window,), np.minimum
+    )[window]
+    df[f"distance_from_min_{str(window)}"] = np.log(
+        df["close"] / df[f"rolling_min_{str(window)}_close"]
+    )
+    _check_distance_from_low(
+        df["close"],
+        df[f"rolling_min_{str(window)}_close"],
+        df[f"distance_from_min_{str(window)}"],
+        window,
+    )
     return df
 
 
@@ -140,8 +237,11 @@ def validate_data(df: pd.DataFrame) -> None:
     if not pd.api.types.is_datetime64_any_dtype(df["date"]):
         raise TypeError("Column 'date' must be datetime64[ns]")
 
-    if not pd.api.types.is_string_dtype(df["symbol"]):
-        raise TypeError("Column symbol must be a string")
+    symbol_dtype = df["symbol"].dtype
+    if isinstance(symbol_dtype, pd.CategoricalDtype):
+        symbol_dtype = symbol_dtype.categories.dtype
+    if not pd.api.types.is_string_dtype(symbol_dtype):
+        raise TypeError("Column symbol must be a string or a categorical of strings")
     if not pd.api.types.is_numeric_dtype(df["open"]):
         raise TypeError("Column Open must be a numeric")
     if not pd.api.types.is_numeric_dtype(df["close"]):
@@ -152,22 +252,626 @@ def validate_data(df: pd.DataFrame) -> None:
         raise ValueError("Column 'open' must contain only positive values")
 
 
+def symbol_blocks(symbols: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Factorizes a symbol column sorted by (symbol, date) once.
+    Returns start row of every symbol block and position of each row
+    inside its block.
+    """
+    codes, _ = pd.factorize(symbols)
+    is_start = np.ones(len(codes), dtype=bool)
+    is_start[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(is_start)
+    block = np.cumsum(is_start) - 1
+    position = np.arange(len(codes)) - starts[block]
+    return starts, position
+
+
+def _block_shift(values: np.ndarray, position: np.ndarray) -> np.ndarray:
+    """Shift by one row inside every symbol block (NaN at block start)."""
+    out = np.empty(len(values), dtype="float64")
+    out[1:] = values[:-1]
+    out[position == 0] = np.nan
+    return out
+
+
+def rolling_extrema(
+    values: np.ndarray,
+    position: np.ndarray,
+    windows: tuple[int, ...],
+    func: np.ufunc = np.maximum,
+) -> dict[int, np.ndarray]:
+    """
+    Rolling max (func=np.maximum) or min (func=np.minimum) for all windows
+    in one sweep over an array sorted by (symbol, date).
+
+    Builds doubling levels level_k[i] = func(values[i - 2**k + 1 : i + 1]),
+    so every window w is func of two overlapping level_k reads with
+    k = floor(log2(w)). Total cost is O(n log max(windows)) for all windows.
+    Rows with fewer than w observations in their symbol block are NaN, and
+    NaN inside a window propagates, like rolling(window).max()/min().
+    """
+    values = np.asarray(values, dtype="float64")
+    n = len(values)
+    out = {}
+    level = values.copy()
+    span = 1
+    for window in sorted(set(windows)):
+        while span * 2 <= window:
+            func(level[span:], level[:-span], out=level[span:])
+            span *= 2
+        extreme = np.full(n, np.nan)
+        offset = window - span
+        func(
+            level[window - 1 :], level[span - 1 : n - offset], out=extreme[window - 1 :]
+        )
+        extreme[position < window - 1] = np.nan
+        out[window] = extreme
+    return out
+
+
+def _anchored_prefix(
+    x: np.ndarray, segment: np.ndarray, offset: np.ndarray, n_segments: int, span: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Running sums that restart at every anchor segment. Returns, for every
+    row, the segment sum up to the row (inclusive), minus the segment sum
+    before the row, and the sum from the row to the segment end (inclusive).
+    """
+    grid = np.zeros((n_segments, span), dtype="float64")
+    grid[segment, offset] = x
+    np.cumsum(grid, axis=1, out=grid)
+    head = grid[segment, offset]
+    tail = grid[segment, span - 1] - head + x
+    return head, x - head, tail
+
+
+def _window_mean(
+    sums: tuple[np.ndarray, np.ndarray, np.ndarray],
+    same_segment: np.ndarray,
+    window: int,
+) -> np.ndarray:
+    """Mean over `window` rows ending at each row >= window - 1."""
+    head, neg_before, tail = sums
+    last = window - 1
+    m = len(head) - last
+    out = np.where(same_segment, neg_before[:m], tail[:m])
+    out += head[last:]
+    out /= window
+    return out
+
+
+def rolling_moments(
+    values: np.ndarray,
+    position: np.ndarray,
+    windows: tuple[int, ...],
+) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """
+    Rolling mean and population std (ddof=0) for all windows from one set
+    of running sums of x and x**2 over an array sorted by (symbol, date).
+
+    Drift correction: running sums restart at anchors every `span` rows of
+    a symbol (span = smallest power of two >= max(windows)), so a window
+    sum is either a difference inside one anchor segment or head + tail
+    across one anchor. Rounding error is bounded by `span` rows no matter
+    how long the history is. Values are also shifted by the first
+    observation of their symbol to limit cancellation in E[x**2] - E[x]**2.
+
+    A window is valid only if all its values are present (min_periods=window).
+    A window whose rolling max equals its rolling min is exactly flat and
+    gets std 0; elsewhere only negative rounding residue is clamped to 0.
+    Each window costs O(n) regardless of its length, so adding windows only
+    adds the final differencing step.
+    """
+    values = np.asarray(values, dtype="float64")
+    position = np.asarray(position)
+    n = len(values)
+    if n == 0:
+        return {window: (values.copy(), values.copy()) for window in windows}
+
+    span = 1 << int(np.ceil(np.log2(max(windows))))
+    offset = position % span
+    segment = np.cumsum(offset == 0) - 1
+    n_segments = int(segment[-1]) + 1
+
+    present = ~np.isnan(values)
+    starts = np.flatnonzero(position == 0)
+    lengths = np.diff(np.append(starts, n))
+    rows = np.arange(n)
+
+    # number of consecutive present values of the same symbol ending at
+    # each row: a window is complete when run >= window
+    barrier = np.where(present, -1, rows)
+    barrier = np.maximum(barrier, np.repeat(starts - 1, lengths))
+    np.maximum.accumulate(barrier, out=barrier)
+    run = rows - barrier
+
+    # shifted-data centering on the first present value of each block
+    # (uses no later observation, so no look-ahead even in rounding)
+    first = np.minimum.reduceat(np.where(present, rows, n), starts)
+    block_center = np.where(first < n, values[np.minimum(first, n - 1)], 0.0)
+    center = np.repeat(np.nan_to_num(block_center), lengths)
+    centered = np.where(present, values - center, 0.0)
+
+    sum_1 = _anchored_prefix(centered, segment, offset, n_segments, span)
+    sum_2 = _anchored_prefix(centered * centered, segment, offset, n_segments, span)
+    complete = tuple(window for window in windows if window <= n)
+    highs = rolling_extrema(values, position, complete, np.maximum)
+    lows = rolling_extrema(values, position, complete, np.minimum)
+
+    moments = {}
+    for window in windows:
+        if window > n:
+            # longer than the whole history: never complete
+            moments[window] = (np.full(n, np.nan), np.full(n, np.nan))
+            continue
+        last = window - 1
+        same_segment = offset[last:] >= last
+
+        s1 = _window_mean(sum_1, same_segment, window)
+        var = _window_mean(sum_2, same_segment, window)
+        var -= s1 * s1
+        np.maximum(var, 0.0, out=var)
+        # an exactly flat window (always the case for window=1) has std 0
+        var[highs[window][last:] == lows[window][last:]] = 0.0
+        np.sqrt(var, out=var)
+        s1 += center[last:]
+
+        incomplete = run[last:] < window
+        s1[incomplete] = np.nan
+        var[incomplete] = np.nan
+        mean = np.empty(n)
+        std = np.empty(n)
+        mean[:last] = np.nan
+        std[:last] = np.nan
+        mean[last:] = s1
+        std[last:] = var
+        moments[window] = (mean, std)
+    return moments
+
+
+def price_feature_columns(
+    windows: tuple[int, ...], keep_intermediates: bool = True
+) -> list[str]:
+    """
+    Declarative list of the columns add_price_features produces, in order.
+    rolling_high_*_close / rolling_min_*_close are intermediates of the
+    distance features and are listed only if keep_intermediates.
+    """
+    columns = ["log_return"]
+    for window in windows:
+        columns += [
+            f"px_log_return_mean_{window}",
+            f"px_log_return_volatility_{window}",
+            f"px_log_return_ratio_{window}",
+        ]
+        if keep_intermediates:
+            columns.append(f"rolling_high_{window}_close")
+        columns.append(f"distance_from_high_{window}")
+        if keep_intermediates:
+            columns.append(f"rolling_min_{window}_close")
+        columns.append(f"distance_from_min_{window}")
+    return columns
+
+
+def _feature_plan(
+    windows: tuple[int, ...], columns: list[str] | None
+) -> tuple[list[str], tuple[int, ...], tuple[int, ...], tuple[int, ...]]:
+    """
+    Names of the arrays price_feature_arrays returns for `columns` (in
+    order) and the windows of each kernel that must be computed, resolved
+    from the feature graph.
+    """
+    all_columns = price_feature_columns(windows)
+    needed = set(resolve_features(all_columns if columns is None else columns, windows))
+
+    momentum_windows = tuple(w for w in windows if f"log_return_moments_{w}" in needed)
+    high_windows = tuple(w for w in windows if f"rolling_high_{w}_close" in needed)
+    low_windows = tuple(w for w in windows if f"rolling_min_{w}_close" in needed)
+    names = [col for col in all_columns if col in needed]
+    return names, momentum_windows, high_windows, low_windows
+
+
+def price_feature_arrays(
+    close: np.ndarray,
+    position: np.ndarray,
+    windows: tuple[int, ...],
+    columns: list[str] | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Computes price features for all windows in one pass over a close
+    array sorted by (symbol, date).
+
+    Only the kernels needed for `columns` (default: all) are computed, and
+    the result holds exactly the arrays named by _feature_plan.
+
+    Every symbol block starts with NaN log returns, so rolling windows that
+    would cross a block boundary never reach min_periods and stay NaN,
+    exactly like a per-symbol groupby. Rolling mean/volatility come from
+    rolling_moments and rolling max/min from rolling_extrema.
+    """
+    close = np.asarray(close, dtype="float64")
+    names, momentum_windows, high_windows, low_windows = _feature_plan(windows, columns)
+
+    features = {}
+    if "log_return" in names:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_ret = np.log(close / _block_shift(close, position))
+        features["log_return"] = log_ret
+
+    moments = {}
+    if momentum_windows:
+        shifted = _block_shift(log_ret, position)
+        moments = rolling_moments(shifted, position, momentum_windows)
+    highs = rolling_extrema(close, position, high_windows, np.maximum)
+    lows = rolling_extrema(close, position, low_windows, np.minimum)
+
+    for window in windows:
+        if window in moments:
+            mean, volatility = moments[window]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = mean / volatility
+            features[f"px_log_return_mean_{window}"] = mean
+            features[f"px_log_return_volatility_{window}"] = volatility
+            features[f"px_log_return_ratio_{window}"] = ratio
+
+        for extremes, extreme_col, distance_col in (
+            (highs, f"rolling_high_{window}_close", f"distance_from_high_{window}"),
+            (lows, f"rolling_min_{window}_close", f"distance_from_min_{window}"),
+        ):
+            if window in extremes:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    distance = np.log(close / extremes[window])
+                features[extreme_col] = extremes[window]
+                features[distance_col] = distance
+
+    # kernels compute whole families; return exactly the planned arrays
+    return {name: features[name] for name in names}
+
+
+def _price_feature_shard(
+    input_name: str,
+    output_name: str,
+    n: int,
+    n_features: int,
+    start: int,
+    stop: int,
+    windows: tuple[int, ...],
+    columns: list[str] | None,
+) -> None:
+    """Worker: features of rows [start, stop) written into shared memory."""
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    try:
+        inputs = np.ndarray((2, n), dtype="float64", buffer=input_shm.buf)
+        outputs = np.ndarray((n_features, n), dtype="float64", buffer=output_shm.buf)
+        close = inputs[0, start:stop]
+        position = inputs[1, start:stop].astype("int64")
+        features = price_feature_arrays(close, position, windows, columns)
+        names = _feature_plan(windows, columns)[0]
+        for i, name in enumerate(names):
+            outputs[i, start:stop] = features[name]
+        del inputs, outputs
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+
+def _resolve_n_jobs(n_jobs: int) -> int:
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError(f"n_jobs must be a positive integer or -1, got: {n_jobs}")
+    return n_jobs
+
+
+def parallel_price_feature_arrays(
+    close: np.ndarray,
+    position: np.ndarray,
+    windows: tuple[int, ...],
+    columns: list[str] | None = None,
+    n_jobs: int = -1,
+) -> dict[str, np.ndarray]:
+    """
+    price_feature_arrays split into symbol shards run in a process pool.
+
+    Shards are contiguous row ranges cut at symbol block starts, balanced by
+    row count. Close/position and the output matrix live in shared memory,
+    so workers only receive row bounds (no pickled DataFrames) and write
+    their rows in place; the result is already in (symbol, date) order.
+    """
+    close = np.asarray(close, dtype="float64")
+    n = len(close)
+    names = _feature_plan(windows, columns)[0]
+    starts = np.flatnonzero(np.asarray(position) == 0)
+    n_jobs = min(_resolve_n_jobs(n_jobs), len(starts))
+    if n_jobs <= 1:
+        return price_feature_arrays(close, position, windows, columns)
+
+    # block start at or after each even row split (the last block absorbs
+    # splits past its start)
+    cut_index = np.searchsorted(starts, np.linspace(0, n, n_jobs + 1)[1:-1])
+    cuts = starts[np.minimum(cut_index, len(starts) - 1)]
+    bounds = np.unique(np.concatenate([[0], cuts, [n]]))
+
+    input_shm = shared_memory.SharedMemory(create=True, size=2 * n * 8)
+    output_shm = shared_memory.SharedMemory(create=True, size=len(names) * n * 8)
+    try:
+        inputs = np.ndarray((2, n), dtype="float64", buffer=input_shm.buf)
+        inputs[0] = close
+        inputs[1] = position
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            jobs = [
+                pool.submit(
+                    _price_feature_shard,
+                    input_shm.name,
+                    output_shm.name,
+                    n,
+                    len(names),
+                    int(start),
+                    int(stop),
+                    tuple(windows),
+                    columns,
+                )
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            for job in jobs:
+                job.result()
+
+        outputs = np.ndarray((len(names), n), dtype="float64", buffer=output_shm.buf)
+        features = {name: outputs[i].copy() for i, name in enumerate(names)}
+        del inputs, outputs
+    finally:
+        input_shm.close()
+        input_shm.unlink()
+        output_shm.close()
+        output_shm.unlink()
+    return features
+
+
+FEATURE_DTYPES = ("float64", "float32")
+RANK_CHECK_SAMPLE_DATES = 20
+FLOAT32_MAX_TIE_RATE = 0.01
+
+
+def _check_distance_invariants(
+    close: np.ndarray,
+    features: dict[str, np.ndarray],
+    windows: tuple[int, ...],
+    rows: np.ndarray | None,
+) -> None:
+    for window in windows:
+        if f"distance_from_high_{window}" in features:
+            _check_distance_from_high(
+                close,
+                features[f"rolling_high_{window}_close"],
+                features[f"distance_from_high_{window}"],
+                window,
+                rows,
+            )
+        if f"distance_from_min_{window}" in features:
+            _check_distance_from_low(
+                close,
+                features[f"rolling_min_{window}_close"],
+                features[f"distance_from_min_{window}"],
+                window,
+                rows,
+            )
+
+
+def _rank_check_dates(dates: pd.Series, validate: str) -> np.ndarray:
+    """Date codes used by the float32 rank guard (-1 = row not checked)."""
+    codes, uniques = pd.factorize(dates)
+    if validate == "sample" and len(uniques) > RANK_CHECK_SAMPLE_DATES:
+        rng = np.random.default_rng(0)
+        chosen = rng.choice(len(uniques), size=RANK_CHECK_SAMPLE_DATES, replace=False)
+        codes = np.where(np.isin(codes, chosen), codes, -1)
+    return codes
+
+
+def _downcast_feature(
+    name: str, values: np.ndarray, date_codes: np.ndarray | None
+) -> np.ndarray:
+    """
+    Stores a float64 feature as float32. Rounding to nearest is monotone, so
+    orderings can only change by overflow or by distinct values of the same
+    date collapsing into a tie. Overflow always raises; new same-date ties
+    raise once they exceed FLOAT32_MAX_TIE_RATE of the checked rows (values
+    closer than float32 resolution carry no ranking information).
+    """
+    out = values.astype("float32")
+    if (np.isinf(out) & np.isfinite(values)).any():
+        raise ValueError(f"Column {name} overflows float32")
+
+    if date_codes is not None:
+        checked = (date_codes >= 0) & ~np.isnan(values)
+        wide, narrow = values[checked], out[checked]
+        # (date, float32 value) packed into one order-preserving uint64 key
+        bits = narrow.view("uint32").astype("uint64")
+        bits = np.where(bits >> 31, bits ^ 0xFFFFFFFF, bits | 0x80000000)
+        key = (date_codes[checked].astype("uint64") << 32) | bits
+        order = np.argsort(key)
+        key, wide = key[order], wide[order]
+        collapsed = (key[1:] == key[:-1]) & (wide[1:] != wide[:-1])
+        if collapsed.sum() > FLOAT32_MAX_TIE_RATE * len(key):
+            raise ValueError(
+                f"Column {name} loses per-date rank order in float32, use float64"
+            )
+    return out
+
+
+def output_columns(
+    windows: tuple[int, ...],
+    keep_intermediates: bool = True,
+    columns: list[str] | None = None,
+) -> list[str]:
+    """Feature columns add_price_features writes, in price_feature_columns order."""
+    if columns is None:
+        return price_feature_columns(windows, keep_intermediates)
+    unknown = set(columns) - set(price_feature_columns(windows))
+    if unknown:
+        raise KeyError(f"Unknown price feature columns: {sorted(unknown)}")
+    return [col for col in price_feature_columns(windows) if col in columns]
+
+
+def feature_frame(
+    data: pd.DataFrame,
+    sorted_columns: list[str] = ["symbol", "date"],
+    inplace: bool = False,
+) -> pd.DataFrame:
+    """
+    Frame feature columns are written into: `data` itself sorted in place
+    (inplace=True), otherwise a sorted frame that is never `data`.
+    """
+    if inplace:
+        if not is_sorted(data, sorted_columns):
+            data.sort_values(sorted_columns, inplace=True)
+        if not _has_default_index(data):
+            data.reset_index(drop=True, inplace=True)
+        return data
+    df = sort_data(data, sorted_columns)
+    if df is data:
+        df = data.copy(deep=False)
+    return df
+
+
 def add_price_features(
     data: pd.DataFrame,
     windows: tuple[int, ...],
     sorted_columns: list[str] = ["symbol", "date"],
+    inplace: bool = False,
+    validate: str = "full",
+    dtype: str = "float64",
+    keep_intermediates: bool = True,
+    columns: list[str] | None = None,
+    n_jobs: int = 1,
 ) -> pd.DataFrame:
+    """
+    Adds price features for every window.
 
-    df = data.copy()
-    validate_data(df)
-    df = sort_data(df, sorted_columns)
-    df = add_log_return(df)
+    Input already sorted by sorted_columns is neither sorted nor copied again.
+    With inplace=True the caller's frame is sorted in place (if needed) and
+    feature columns are written directly into it.
 
-    for window in windows:
-        df = add_px_log_return_mean(df, window)
-        df = add_px_log_return_volatility(df, window)
-        df = add_px_log_return_ratio(df, window)
-        df = add_distance_from_high(df, window)
-        df = add_distance_from_low(df, window)
+    validate controls the distance_from_high/low invariant checks:
+    "full" checks every row, "sample" checks a fixed random sample of
+    VALIDATE_SAMPLE_SIZE rows and "off" skips them for certified datasets.
+
+    dtype="float32" halves the memory of the feature columns. Features are
+    still accumulated in float64 and only stored as float32; unless
+    validate="off", per-date ranks and the distance invariants are checked
+    again on the stored float32 values (the distances against the float64
+    close and extremes they were computed from).
+
+    Output columns are price_feature_columns(windows, keep_intermediates),
+    or exactly `columns` when given (any of price_feature_columns(windows)).
+    Feature families that are not requested are not computed.
+
+    n_jobs > 1 (or -1 for all cores) computes symbol shards in parallel,
+    see parallel_price_feature_arrays.
+    """
+    validate_data(data)
+    if validate not in VALIDATE_MODES:
+        raise ValueError(f"validate must be one of {VALIDATE_MODES}, got: {validate}")
+    if dtype not in FEATURE_DTYPES:
+        raise ValueError(f"dtype must be one of {FEATURE_DTYPES}, got: {dtype}")
+
+    output = output_columns(windows, keep_intermediates, columns)
+    df = feature_frame(data, sorted_columns, inplace)
+
+    _, position = symbol_blocks(df["symbol"])
+    close = df["close"].to_numpy(dtype="float64")
+    if n_jobs == 1:
+        features = price_feature_arrays(close, position, windows, output)
+    else:
+        features = parallel_price_feature_arrays(
+            close, position, windows, output, n_jobs
+        )
 
+    rows = _sample_rows(len(df), validate)
+    if validate != "off":
+        _check_distance_invariants(close, features, windows, rows)
+
+    if dtype == "float32":
+        date_codes = None
+        if validate != "off":
+            date_codes = _rank_check_dates(df["date"], validate)
+        wide = {}
+        for col in features:
+            if date_codes is not None and col.startswith("rolling_"):
+                wide[col] = features[col]
+            features[col] = _downcast_feature(
+                col, features[col], date_codes if col in output else None
+            )
+        if validate != "off":
+            # rounding to nearest is monotone and maps 0 to 0, so the stored
+            # distances keep the sign and the zeros they had in float64
+            _check_distance_invariants(close, {**features, **wide}, windows, rows)
+
+    for col in output:
+        df[col] = features.pop(col)
     return df
+
+
+STATE_COLUMNS = ["symbol", "date", "open", "close"]
+
+
+def _tail_rows(df: pd.DataFrame, n_rows: int) -> pd.DataFrame:
+    """Last n_rows of every symbol block of a frame sorted by (symbol, date)."""
+    starts, position = symbol_blocks(df["symbol"])
+    lengths = np.diff(np.append(starts, len(df)))
+    block_len = np.repeat(lengths, lengths)
+    return df[position >= block_len - n_rows].reset_index(drop=True)
+
+
+def price_feature_state(data: pd.DataFrame, windows: tuple[int, ...]) -> pd.DataFrame:
+    """
+    State needed to extend price features by new trading days: the last
+    max(windows) + 1 price rows per symbol (enough history for the shifted
+    rolling mean/volatility and the rolling high/low of the next row).
+    """
+    validate_data(data)
+    df = sort_data(data)
+    state = _tail_rows(df[STATE_COLUMNS], max(windows) + 1)
+    state.attrs["max_window"] = max(windows)
+    return state
+
+
+def update_price_features(
+    state: pd.DataFrame,
+    new_data: pd.DataFrame,
+    windows: tuple[int, ...],
+    validate: str = "full",
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Computes price features only for new_data rows, given the state from
+    price_feature_state (or a previous update).
+
+    Features are computed on state + new rows, which is just enough history
+    to reproduce a full recompute of add_price_features for the new rows.
+    Returns (features of the new rows, updated state).
+    """
+    max_window = state.attrs.get("max_window")
+    if max_window is not None and max_window < max(windows):
+        raise ValueError(
+            f"State keeps history for windows up to {max_window}, got {max(windows)}"
+        )
+    validate_data(new_data)
+
+    last_date = state.groupby("symbol", observed=True)["date"].max()
+    first_new = new_data.groupby("symbol", observed=True)["date"].min()
+    common = first_new.index.intersection(last_date.index)
+    if (first_new[common] <= last_date[common]).any():
+        raise ValueError("New rows must be later than the last state date per symbol")
+
+    combined = pd.concat(
+        [state[STATE_COLUMNS].assign(_is_new=False), new_data.assign(_is_new=True)],
+        ignore_index=True,
+    )
+    combined = add_price_features(combined, windows, inplace=True, validate=validate)
+
+    is_new = combined.pop("_is_new").to_numpy(dtype=bool)
+    new_state = _tail_rows(combined[STATE_COLUMNS], max(windows) + 1)
+    new_state.attrs["max_window"] = max(windows)
+    features = combined[is_new].astype(new_data.dtypes.to_dict())
+    return features.reset_index(drop=True), new_state
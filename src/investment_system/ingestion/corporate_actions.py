@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+EVENT_COLUMNS = ["symbol", "date", "type", "value"]
+EVENT_TYPES = ("split", "dividend")
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+_DAY_OFFSET = 1_000_000
+_SYMBOL_STRIDE = 10_000_000
+
+
+def load_corporate_actions(path: Path) -> pd.DataFrame:
+    """
+    Loads a split/dividend events table (.csv or .parquet) with columns
+    symbol, date (ex-date), type ("split" | "dividend") and value: the split
+    ratio (4.0 for a 4:1 split) or the cash dividend per share.
+    """
+    path = Path(path)
+    if path.suffix == ".csv":
+        events = pd.read_csv(path, parse_dates=["date"])
+    else:
+        events = pd.read_parquet(path)
+    validate_corporate_actions(events)
+    return events
+
+
+def validate_corporate_actions(events: pd.DataFrame) -> None:
+    missing = set(EVENT_COLUMNS) - set(events.columns)
+    if missing:
+        raise KeyError(f"Missing columns: {missing}")
+    unknown = set(events["type"]) - set(EVENT_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown event types: {sorted(unknown)}")
+    if (events["value"] <= 0).any():
+        raise ValueError("Column 'value' must contain only positive values")
+
+
+def _row_keys(codes: np.ndarray, dates: pd.Series) -> np.ndarray:
+    """(symbol code, day) packed into one sortable int64 key."""
+    days = dates.to_numpy(dtype="datetime64[D]").astype("int64") + _DAY_OFFSET
+    return codes.astype("int64") * _SYMBOL_STRIDE + days
+
+
+def adjustment_factors(prices: pd.DataFrame, events: pd.DataFrame) -> np.ndarray:
+    """
+    Backward cumulative adjustment factor of every row of prices sorted by
+    (symbol, date): the product of the factors of all events of its symbol
+    with an ex-date after the row. A split with ratio r contributes 1 / r,
+    a dividend D contributes 1 - D / close of the last row before the
+    ex-date. Rows on or after the last event keep factor 1.
+    """
+    n = len(prices)
+    if n == 0:
+        return np.ones(0)
+    symbols = pd.concat(
+        [prices["symbol"].astype(str), events["symbol"].astype(str)], ignore_index=True
+    )
+    codes, _ = pd.factorize(symbols)
+    price_codes, event_codes = codes[:n], codes[n:]
+
+    # prices sorted by symbol: codes are in order of first appearance, so
+    # they increase with the rows and the packed keys are sorted
+    price_keys = _row_keys(price_codes, prices["date"])
+    event_keys = _row_keys(event_codes, events["date"])
+
+    # first row of the symbol on or after the ex-date; all earlier rows of
+    # the symbol are adjusted by the event
+    ex_row = np.searchsorted(price_keys, event_keys, side="left")
+    block_start = np.searchsorted(price_keys, event_codes * _SYMBOL_STRIDE)
+    known = event_codes <= price_codes.max(initial=-1)
+    applies = known & (ex_row > block_start)
+
+    close = prices["close"].to_numpy(dtype="float64")
+    value = events["value"].to_numpy(dtype="float64")
+    is_split = (events["type"] == "split").to_numpy()
+    prev_close = close[np.maximum(ex_row - 1, 0)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(is_split, 1 / value, 1 - value / prev_close)
+    if (applies & (factor <= 0)).any():
+        raise ValueError("Dividend is not smaller than the previous close")
+
+    # log factor of each event is added at the last row before its ex-date;
+    # a row's factor sums it over that row and the later rows of its symbol
+    # (reverse cumulative sum restarted at every block end)
+    log_factor = np.zeros(n + 1)
+    np.add.at(log_factor, ex_row[applies] - 1, np.log(factor[applies]))
+    suffix = np.cumsum(log_factor[::-1])[::-1]
+    block_end = np.searchsorted(price_keys, (price_codes + 1) * _SYMBOL_STRIDE)
+    cumulative = suffix[:n] - suffix[block_end]
+    return np.exp(cumulative)
+
+
+def adjust_prices(prices: pd.DataFrame, events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Split- and dividend-adjusted prices, sorted by (symbol, date).
+    open/high/low/close are multiplied by the cumulative factor (stored in
+    adj_factor, so raw = adjusted / adj_factor) and volume is scaled by the
+    split part of it, so the adjusted history has no jumps at ex-dates.
+    """
+    validate_corporate_actions(events)
+    df = prices.sort_values(["symbol", "date"]).reset_index(drop=True)
+    factor = adjustment_factors(df, events)
+    split_factor = adjustment_factors(df, events[events["type"] == "split"])
+
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col] * factor
+    if "volume" in df.columns:
+        df["volume"] = df["volume"] / split_factor
+    df["adj_factor"] = factor
+    df["adj_split_factor"] = split_factor
+    return df
+
+
+def unadjust_prices(adjusted: pd.DataFrame) -> pd.DataFrame:
+    """Raw prices back from adjust_prices output."""
+    df = adjusted.drop(columns=["adj_factor", "adj_split_factor"])
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = adjusted[col] / adjusted["adj_factor"]
+    if "volume" in df.columns:
+        df["volume"] = adjusted["volume"] * adjusted["adj_split_factor"]
+    return df
+
+
+def readjust_symbols(
+    adjusted: pd.DataFrame, events: pd.DataFrame, symbols: list[str]
+) -> pd.DataFrame:
+    """
+    Re-applies all `events` to `symbols` only (e.g. the symbols of newly
+    arrived events) and leaves every other symbol of an adjust_prices
+    output untouched.
+    """
+    affected = adjusted["symbol"].isin(symbols).to_numpy()
+    if not affected.any():
+        return adjusted
+    raw = unadjust_prices(adjusted[affected])
+    readjusted = adjust_prices(raw, events[events["symbol"].isin(symbols)])
+    df = pd.concat([adjusted[~affected], readjusted], ignore_index=True)
+    return df.sort_values(["symbol", "date"]).reset_index(drop=True)
@@ -1,18 +1,24 @@
+import io
 import os
 import json
+import sqlite3
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime, timezone
 
 import yaml
 import requests
 import pandas as pd
+from investment_system.common.http import full_jitter, pooled_session
 
 
 BASE_URL = "https://api.marketaux.com/v1/news/all"
 LIMIT_PER_REQUEST = 20  # max 20 artykułów na dzień
 CONFIG_PATH = Path(r"C:\Users\pawel\Desktop\Investment_System\configs\base.yaml")
 OUT_ROOT = Path("data/marketaux_monthly")
+CHECKPOINT_FILE = "_checkpoints.sqlite"
 
 
 class DailyLimitReached(RuntimeError):
@@ -64,18 +70,28 @@ def empty_result_df() -> pd.DataFrame:
             "source",
             "language",
             "entities_json",
+            "sentiment_score",
         ]
     )
 
 
+def entity_sentiment(entities: list, symbol: str) -> float | None:
+    """Sentiment score of the first entity of `symbol`, flattened at download."""
+    for entity in entities:
+        if isinstance(entity, dict) and entity.get("symbol") == symbol:
+            return entity.get("sentiment_score")
+    return None
+
+
 def normalize_item(
-    item: dict, symbol: str, day_start: datetime, day_end: datetime
+    item: dict, symbol: str, day_start: datetime, day_end: datetime, page: int = 1
 ) -> dict:
+    entities = item.get("entities") or []
     return {
         "requested_symbol": symbol,
         "window_start": day_start.strftime("%Y-%m-%d"),
         "window_end": (day_end - pd.Timedelta(seconds=1)).strftime("%Y-%m-%d"),
-        "page": 1,
+        "page": page,
         "uuid": item.get("uuid"),
         "published_at": item.get("published_at"),
         "title": item.get("title"),
@@ -84,32 +100,120 @@ def normalize_item(
         "url": item.get("url"),
         "source": item.get("source"),
         "language": item.get("language"),
-        "entities_json": json.dumps(item.get("entities") or [], ensure_ascii=False),
+        "entities_json": json.dumps(entities, ensure_ascii=False),
+        "sentiment_score": entity_sentiment(entities, symbol),
     }
 
 
+class TokenBucket:
+    """
+    Request budget shared by all workers: on average at most `rate`
+    requests/s (bursts of up to `burst`) and at most `daily_quota` requests
+    per UTC day. acquire() blocks for the next free slot and raises
+    DailyLimitReached once the quota is used up.
+
+    With usage_path (the checkpoint journal, see open_checkpoints) the
+    count of the UTC day is stored in its quota table, so a restart on the
+    same day continues from it instead of from 0.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        daily_quota: int | None = None,
+        usage_path: Path | None = None,
+    ):
+        if rate <= 0:
+            raise ValueError(f"rate must be greater than 0, got: {rate}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, got: {burst}")
+        self.rate = rate
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._day = None
+        self._used = 0
+        self._usage = None
+        if daily_quota is not None and usage_path is not None:
+            # own connection: acquire() runs in the worker threads
+            open_checkpoints(usage_path).close()
+            self._usage = sqlite3.connect(usage_path, check_same_thread=False)
+
+    def _stored_usage(self, day: str) -> int:
+        if self._usage is None:
+            return 0
+        row = self._usage.execute(
+            "SELECT used FROM quota WHERE day = ?", (day,)
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.daily_quota is not None:
+                today = datetime.now(timezone.utc).date().isoformat()
+                if today != self._day:
+                    self._day, self._used = today, self._stored_usage(today)
+                if self._used >= self.daily_quota:
+                    raise DailyLimitReached(
+                        f"Wykorzystano dzienny budżet {self.daily_quota} requestów."
+                    )
+                self._used += 1
+                if self._usage is not None:
+                    with self._usage:
+                        self._usage.execute(
+                            "INSERT OR REPLACE INTO quota VALUES (?, ?)",
+                            (today, self._used),
+                        )
+
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+            # a negative balance is a reservation: wait until it is paid off
+            self._tokens -= 1
+            wait = max(-self._tokens / self.rate, 0.0)
+        time.sleep(wait)
+
+    def close(self) -> None:
+        if self._usage is not None:
+            self._usage.close()
+            self._usage = None
+
+
 def get_json_with_retry(
     session: requests.Session,
     params: dict,
     timeout: int = 30,
     max_retries: int = 5,
+    base_url: str = BASE_URL,
+    bucket: TokenBucket | None = None,
+    backoff: float = 1.0,
 ) -> dict:
+    """
+    GET with retries on connection errors, 429 and 5xx; 402 (daily limit)
+    raises DailyLimitReached. Every attempt takes a slot from `bucket`;
+    retries sleep full_jitter(attempt, backoff).
+    """
     for attempt in range(1, max_retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        sleep_s = full_jitter(attempt, backoff)
         try:
-            resp = session.get(BASE_URL, params=params, timeout=timeout)
+            resp = session.get(base_url, params=params, timeout=timeout)
 
             if resp.status_code == 402:
                 raise DailyLimitReached("Dobity dzienny limit requestów w Marketaux.")
 
             if resp.status_code == 429:
-                sleep_s = min(2**attempt, 60)
-                print(f"429 rate limit, sleep {sleep_s}s")
+                print(f"429 rate limit, sleep {sleep_s:.1f}s")
                 time.sleep(sleep_s)
                 continue
 
             if 500 <= resp.status_code < 600:
-                sleep_s = min(2**attempt, 60)
-                print(f"{resp.status_code} server error, sleep {sleep_s}s")
+                print(f"{resp.status_code} server error, sleep {sleep_s:.1f}s")
                 time.sleep(sleep_s)
                 continue
 
@@ -125,48 +229,44 @@ def get_json_with_retry(
                     f"Request failed after {max_retries} retries: {e}"
                 ) from e
 
-            sleep_s = min(2**attempt, 60)
-            print(f"Request error: {e}. Retry in {sleep_s}s")
+            print(f"Request error: {e}. Retry in {sleep_s:.1f}s")
             time.sleep(sleep_s)
 
     raise RuntimeError("Unexpected retry failure.")
 
 
-def fetch_symbol_day(
-    session: requests.Session,
-    symbol: str,
+def day_params(
+    symbols: str,
     day_start: datetime,
     day_end: datetime,
     api_token: str,
+    page: int = 1,
     language: str = "en",
     group_similar: bool = False,
     must_have_entities: bool = True,
     filter_entities: bool = True,
-) -> pd.DataFrame:
-    """
-    Pobiera maksymalnie 20 artykułów (1 request, page=1) dla jednego dnia.
-    """
-    params = {
+) -> dict:
+    return {
         "api_token": api_token,
-        "symbols": symbol,
+        "symbols": symbols,
         "published_after": to_api_dt(day_start),
         "published_before": to_api_dt(day_end),
         "limit": LIMIT_PER_REQUEST,
-        "page": 1,
+        "page": page,
         "language": language,
         "group_similar": str(group_similar).lower(),
         "must_have_entities": str(must_have_entities).lower(),
         "filter_entities": str(filter_entities).lower(),
     }
 
-    data = get_json_with_retry(session, params=params)
-    batch = data.get("data", [])
 
-    if not batch:
+def day_frame(rows: list[dict]) -> pd.DataFrame:
+    """Artykuły jednego symbolu z jednego dnia: bez duplikatów, po dacie."""
+    if not rows:
         return empty_result_df()
 
-    rows = [normalize_item(item, symbol, day_start, day_end) for item in batch]
     df = pd.DataFrame(rows)
+    df["sentiment_score"] = df["sentiment_score"].astype("float64")
 
     if "uuid" in df.columns and df["uuid"].notna().any():
         df = df.drop_duplicates(subset="uuid")
@@ -182,15 +282,211 @@ def fetch_symbol_day(
     return df
 
 
+def fetch_symbol_day(
+    session: requests.Session,
+    symbol: str,
+    day_start: datetime,
+    day_end: datetime,
+    api_token: str,
+    language: str = "en",
+    group_similar: bool = False,
+    must_have_entities: bool = True,
+    filter_entities: bool = True,
+    base_url: str = BASE_URL,
+    bucket: TokenBucket | None = None,
+) -> pd.DataFrame:
+    """
+    Pobiera maksymalnie 20 artykułów (1 request, page=1) dla jednego dnia.
+    """
+    params = day_params(
+        symbol,
+        day_start,
+        day_end,
+        api_token,
+        language=language,
+        group_similar=group_similar,
+        must_have_entities=must_have_entities,
+        filter_entities=filter_entities,
+    )
+
+    data = get_json_with_retry(session, params=params, base_url=base_url, bucket=bucket)
+    batch = data.get("data", [])
+
+    rows = [normalize_item(item, symbol, day_start, day_end) for item in batch]
+    return day_frame(rows)
+
+
+def fetch_symbols_day(
+    session: requests.Session,
+    symbols: list[str],
+    day_start: datetime,
+    day_end: datetime,
+    api_token: str,
+    language: str = "en",
+    group_similar: bool = False,
+    must_have_entities: bool = True,
+    filter_entities: bool = True,
+    max_pages: int | None = None,
+    base_url: str = BASE_URL,
+    bucket: TokenBucket | None = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Pobiera jeden dzień dla kilku symboli naraz (symbols=AAPL,MSFT,...) i
+    rozdziela artykuły na symbole według ich entities; artykuł o kilku
+    symbolach trafia do każdego z nich. Każdy symbol dostaje najwyżej
+    LIMIT_PER_REQUEST artykułów, tak jak w fetch_symbol_day; kolejne strony
+    są pobierane, dopóki któremuś symbolowi brakuje artykułów i strona jest
+    pełna (opcjonalnie najwyżej max_pages stron). Zwraca symbol -> artykuły
+    dnia.
+    """
+    rows: dict[str, list[dict]] = {symbol: [] for symbol in symbols}
+
+    page = 0
+    while max_pages is None or page < max_pages:
+        page += 1
+        params = day_params(
+            ",".join(symbols),
+            day_start,
+            day_end,
+            api_token,
+            page=page,
+            language=language,
+            group_similar=group_similar,
+            must_have_entities=must_have_entities,
+            filter_entities=filter_entities,
+        )
+        data = get_json_with_retry(
+            session, params=params, base_url=base_url, bucket=bucket
+        )
+        batch = data.get("data", [])
+
+        for item in batch:
+            entity_symbols = {
+                entity.get("symbol")
+                for entity in item.get("entities") or []
+                if isinstance(entity, dict)
+            }
+            for symbol in entity_symbols:
+                if symbol in rows and len(rows[symbol]) < LIMIT_PER_REQUEST:
+                    rows[symbol].append(
+                        normalize_item(item, symbol, day_start, day_end, page)
+                    )
+
+        if len(batch) < LIMIT_PER_REQUEST:
+            break
+        if all(len(symbol_rows) >= LIMIT_PER_REQUEST for symbol_rows in rows.values()):
+            break
+
+    return {symbol: day_frame(symbol_rows) for symbol, symbol_rows in rows.items()}
+
+
 def save_month_parquet(
     df: pd.DataFrame, out_root: Path, symbol: str, month_start: datetime
 ) -> Path:
+    """
+    Zapisuje obok docelowego pliku i podmienia go os.replace, więc przerwany
+    zapis nie zostawia uciętego pliku, który resume uznałby za gotowy.
+    """
     out_path = month_file_path(out_root, symbol, month_start)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(out_path, index=False)
+    tmp_path = out_path.with_name(f"{out_path.name}.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
     return out_path
 
 
+def combine_days(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Scala dni miesiąca, deduplikuje po uuid (lub url) i sortuje po dacie."""
+    combined = pd.concat(dfs, ignore_index=True)
+
+    if "uuid" in combined.columns and combined["uuid"].notna().any():
+        combined = combined.drop_duplicates(subset="uuid")
+    elif "url" in combined.columns and combined["url"].notna().any():
+        combined = combined.drop_duplicates(subset="url")
+
+    if "published_at" in combined.columns:
+        combined = combined.sort_values("published_at").reset_index(drop=True)
+    return combined
+
+
+def open_checkpoints(path: Path) -> sqlite3.Connection:
+    """
+    Dziennik pobranych dni: jeden wiersz na (symbol, dzień) z liczbą
+    artykułów i danymi dnia (parquet), zapisywany zaraz po pobraniu dnia.
+    Tabela quota trzyma liczbę requestów wysłanych w danym dniu UTC
+    (TokenBucket z usage_path).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS days ("
+        "symbol TEXT NOT NULL, day TEXT NOT NULL, rows INTEGER NOT NULL, "
+        "data BLOB, PRIMARY KEY (symbol, day))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, used INTEGER NOT NULL)"
+    )
+    return conn
+
+
+def record_day(
+    conn: sqlite3.Connection, symbol: str, day: str, df: pd.DataFrame
+) -> None:
+    data = None
+    if not df.empty:
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        data = buffer.getvalue()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?)",
+            (symbol, day, len(df), data),
+        )
+
+
+def checkpointed_months(conn: sqlite3.Connection) -> set[tuple[str, str]]:
+    """(symbol, "YYYY-MM") z co najmniej jednym dniem w dzienniku."""
+    rows = conn.execute("SELECT DISTINCT symbol, substr(day, 1, 7) FROM days")
+    return set(rows)
+
+
+def checkpointed_days(
+    conn: sqlite3.Connection, symbol: str, month_key: str
+) -> dict[str, pd.DataFrame]:
+    """Dni miesiąca zapisane w dzienniku: "YYYY-MM-DD" -> artykuły dnia."""
+    rows = conn.execute(
+        "SELECT day, data FROM days WHERE symbol = ? AND day >= ? AND day < ?",
+        (symbol, f"{month_key}-01", f"{month_key}-32"),
+    )
+    return {
+        day: empty_result_df() if data is None else pd.read_parquet(io.BytesIO(data))
+        for day, data in rows
+    }
+
+
+def clear_month(conn: sqlite3.Connection, symbol: str, month_key: str) -> None:
+    with conn:
+        conn.execute(
+            "DELETE FROM days WHERE symbol = ? AND day >= ? AND day < ?",
+            (symbol, f"{month_key}-01", f"{month_key}-32"),
+        )
+
+
+def month_tasks(
+    symbols: list[str], start_date: str, end_date: str
+) -> dict[tuple[str, str], list[tuple[datetime, datetime]]]:
+    """(symbol, "YYYY-MM") -> okna dzienne tego miesiąca, w kolejności dat."""
+    months: dict[str, list[tuple[datetime, datetime]]] = {}
+    for day_start, day_end in day_windows(start_date, end_date):
+        months.setdefault(day_start.strftime("%Y-%m"), []).append((day_start, day_end))
+    return {
+        (symbol, month_key): days
+        for symbol in symbols
+        for month_key, days in months.items()
+    }
+
+
 def backfill_symbols_monthly(
     symbols: list[str],
     start_date: str,
@@ -198,154 +494,236 @@ def backfill_symbols_monthly(
     api_token: str,
     out_root: Path,
     resume: bool = True,
-    request_pause: float = 0.7,
+    rate: float = 2.0,
+    max_workers: int = 8,
+    daily_quota: int | None = None,
+    burst: int = 1,
+    batch_size: int = 1,
+    base_url: str = BASE_URL,
 ) -> pd.DataFrame:
     """
-    Iteruje po dniach (1 request = 1 dzień = max 20 artykułów),
-    ale zapisuje wyniki miesięcznie do plików .parquet.
+    Pobiera dni (1 request = 1 dzień = max 20 artykułów) równolegle w
+    max_workers wątkach, ze wspólną sesją i wspólnym budżetem requestów
+    (rate requestów/s, daily_quota na dzień UTC, liczone w dzienniku także
+    po restarcie), i zapisuje każdy miesiąc do pliku .parquet, gdy tylko
+    wszystkie jego dni są pobrane.
+
+    Każdy pobrany dzień trafia od razu do dziennika out_root/CHECKPOINT_FILE,
+    więc resume pomija dokładnie pobrane dni, także z niedokończonych
+    miesięcy. Po DailyLimitReached (lub Ctrl+C) nie startują nowe requesty,
+    trwające kończą się i są zapisywane w dzienniku; niedokończone miesiące
+    są oznaczone w summary jako "incomplete". Dni zapisanego miesiąca są
+    usuwane z dziennika; dni pustych miesięcy zostają, żeby ich nie
+    pobierać ponownie.
+
+    Z batch_size > 1 jeden request pobiera dzień dla batch_size symboli
+    naraz (fetch_symbols_day), co zmniejsza liczbę requestów mniej więcej
+    batch_size razy.
     """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got: {batch_size}")
     summary_rows = []
+    conn = open_checkpoints(out_root / CHECKPOINT_FILE)
+    bucket = TokenBucket(
+        rate,
+        burst=burst,
+        daily_quota=daily_quota,
+        usage_path=out_root / CHECKPOINT_FILE,
+    )
+    journal = checkpointed_months(conn) if resume else set()
+
+    # stan miesiąca: dni do pobrania, pobrane ramki (po dniu) i błąd
+    months = {}
+    tasks = []
+    for (symbol, month_key), days in month_tasks(symbols, start_date, end_date).items():
+        month_start = pd.Timestamp(f"{month_key}-01", tz="UTC").to_pydatetime()
+        out_path = month_file_path(out_root, symbol, month_start)
+
+        # Jeśli cały miesiąc już zapisany — pomijamy wszystkie dni tego miesiąca
+        if resume and out_path.exists():
+            summary_rows.append(
+                {
+                    "symbol": symbol,
+                    "month": month_key,
+                    "status": "skipped_existing",
+                    "rows": None,
+                    "file": str(out_path),
+                }
+            )
+            continue
+
+        frames = {}
+        if (symbol, month_key) in journal:
+            frames = checkpointed_days(conn, symbol, month_key)
+        todo = [day for day, _ in days if day.strftime("%Y-%m-%d") not in frames]
+        months[(symbol, month_key)] = {
+            "month_start": month_start,
+            "remaining": len(todo),
+            "frames": frames,
+            "error": None,
+        }
+
+    # zadanie = (symbole, dzień); symbole batcha, którym brakuje tego dnia
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i : i + batch_size]
+        for day_start, day_end in day_windows(start_date, end_date):
+            month_key = day_start.strftime("%Y-%m")
+            day = day_start.strftime("%Y-%m-%d")
+            todo = tuple(
+                symbol
+                for symbol in batch
+                if (symbol, month_key) in months
+                and day not in months[(symbol, month_key)]["frames"]
+            )
+            if todo:
+                tasks.append((todo, day_start, day_end))
+
+    stop = threading.Event()
+
+    def fetch(task) -> dict[str, pd.DataFrame] | Exception | None:
+        task_symbols, day_start, day_end = task
+        if stop.is_set():
+            return None
+        options = dict(
+            session=session,
+            day_start=day_start,
+            day_end=day_end,
+            api_token=api_token,
+            language="en",
+            group_similar=True,
+            must_have_entities=True,
+            filter_entities=True,
+            base_url=base_url,
+            bucket=bucket,
+        )
+        try:
+            if batch_size == 1:
+                symbol = task_symbols[0]
+                return {symbol: fetch_symbol_day(symbol=symbol, **options)}
+            return fetch_symbols_day(symbols=list(task_symbols), **options)
+        except DailyLimitReached as e:
+            stop.set()
+            return e
+        except Exception as e:
+            return e
+
+    def finish_month(symbol: str, month_key: str) -> None:
+        state = months.pop((symbol, month_key))
+        out_path = month_file_path(out_root, symbol, state["month_start"])
+        if state["error"] is not None:
+            print(f"ERROR {symbol} {month_key}: {state['error']}")
+            summary_rows.append(
+                {
+                    "symbol": symbol,
+                    "month": month_key,
+                    "status": "error",
+                    "rows": None,
+                    "file": "",
+                    "error": str(state["error"]),
+                }
+            )
+            return
+
+        dfs = [df for _, df in sorted(state["frames"].items()) if not df.empty]
+        if not dfs:
+            summary_rows.append(
+                {
+                    "symbol": symbol,
+                    "month": month_key,
+                    "status": "empty",
+                    "rows": 0,
+                    "file": str(out_path),
+                }
+            )
+            print(f"  => {month_key}: brak artykułów, pominięto zapis")
+            return
+
+        combined = combine_days(dfs)
+        saved_path = save_month_parquet(
+            combined, out_root, symbol, state["month_start"]
+        )
+        # dni znikają z dziennika dopiero, gdy plik miesiąca jest kompletny
+        clear_month(conn, symbol, month_key)
+        summary_rows.append(
+            {
+                "symbol": symbol,
+                "month": month_key,
+                "status": "saved",
+                "rows": len(combined),
+                "file": str(saved_path),
+            }
+        )
+        print(
+            f"  => Zapisano {symbol} {month_key}: {len(combined)} artykułów -> {saved_path}"
+        )
 
-    with requests.Session() as session:
-        for symbol in symbols:
-            print(f"\n=== START {symbol} ===")
-
-            # Grupujemy dni według miesiąca
-            # klucz: "YYYY-MM" -> lista DataFrames z kolejnych dni
-            month_buffers: dict[str, list[pd.DataFrame]] = {}
-
-            try:
-                for day_start, day_end in day_windows(start_date, end_date):
-                    month_key = day_start.strftime("%Y-%m")
-                    month_start = pd.Timestamp(
-                        year=day_start.year, month=day_start.month, day=1, tz="UTC"
-                    ).to_pydatetime()
-                    out_path = month_file_path(out_root, symbol, month_start)
-
-                    # Jeśli cały miesiąc już zapisany — pomijamy wszystkie dni tego miesiąca
-                    if resume and out_path.exists():
-                        if month_key not in month_buffers:
-                            # oznaczamy jako pominięty tylko raz na miesiąc
-                            summary_rows.append(
-                                {
-                                    "symbol": symbol,
-                                    "month": month_key,
-                                    "status": "skipped_existing",
-                                    "rows": None,
-                                    "file": str(out_path),
-                                }
-                            )
-                            month_buffers[month_key] = None  # sentinel: pominięty
-                        continue
-
-                    # Inicjalizuj bufor dla nowego miesiąca
-                    if month_key not in month_buffers:
-                        month_buffers[month_key] = []
-
-                    if month_buffers[month_key] is None:
-                        # miesiąc oznaczony jako pominięty
+    # miesiące w całości z dziennika (np. przerwa tuż przed zapisem)
+    for symbol, month_key in [
+        key for key, state in months.items() if not state["remaining"]
+    ]:
+        finish_month(symbol, month_key)
+
+    interrupted = False
+    with pooled_session(pool_size=max_workers) as session:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # ograniczona liczba zadań w locie zamiast całego backfillu naraz
+            queue = iter(tasks)
+            pending = {}
+            while True:
+                while len(pending) < 2 * max_workers and not stop.is_set():
+                    task = next(queue, None)
+                    if task is None:
+                        break
+                    pending[pool.submit(fetch, task)] = task
+
+                if not pending:
+                    break
+
+                try:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    # dokończ trwające requesty i zapisz je w dzienniku
+                    interrupted = True
+                    stop.set()
+                    continue
+
+                for future in done:
+                    task_symbols, day_start, _ = pending.pop(future)
+                    result = future.result()
+                    if result is None or isinstance(result, DailyLimitReached):
                         continue
 
-                    df_day = fetch_symbol_day(
-                        session=session,
-                        symbol=symbol,
-                        day_start=day_start,
-                        day_end=day_end,
-                        api_token=api_token,
-                        language="en",
-                        group_similar=True,
-                        must_have_entities=True,
-                        filter_entities=True,
-                    )
-
-                    if not df_day.empty:
-                        month_buffers[month_key].append(df_day)
-
-                    print(
-                        f"  {symbol} {day_start.strftime('%Y-%m-%d')} "
-                        f"-> {len(df_day)} artykułów"
-                    )
-
-                    next_day = day_end
-                    is_last_day_of_month = (
-                        next_day.month != day_start.month
-                        or next_day.year != day_start.year
-                    )
-
-                    # Sprawdź też czy to ostatni dzień zakresu end_date
-                    is_last_day_of_range = day_start.strftime("%Y-%m-%d") == end_date
-
-                    if is_last_day_of_month or is_last_day_of_range:
-                        dfs = month_buffers.get(month_key)
-                        if dfs:
-                            combined = pd.concat(dfs, ignore_index=True)
-
-                            # Deduplikacja po scaleniu wszystkich dni
-                            if (
-                                "uuid" in combined.columns
-                                and combined["uuid"].notna().any()
-                            ):
-                                combined = combined.drop_duplicates(subset="uuid")
-                            elif (
-                                "url" in combined.columns
-                                and combined["url"].notna().any()
-                            ):
-                                combined = combined.drop_duplicates(subset="url")
-
-                            if "published_at" in combined.columns:
-                                combined = combined.sort_values(
-                                    "published_at"
-                                ).reset_index(drop=True)
-
-                            saved_path = save_month_parquet(
-                                combined, out_root, symbol, month_start
-                            )
-
-                            summary_rows.append(
-                                {
-                                    "symbol": symbol,
-                                    "month": month_key,
-                                    "status": "saved",
-                                    "rows": len(combined),
-                                    "file": str(saved_path),
-                                }
-                            )
-
-                            print(
-                                f"  => Zapisano {month_key}: "
-                                f"{len(combined)} artykułów -> {saved_path}"
-                            )
+                    month_key = day_start.strftime("%Y-%m")
+                    day = day_start.strftime("%Y-%m-%d")
+                    for symbol in task_symbols:
+                        state = months[(symbol, month_key)]
+                        if isinstance(result, Exception):
+                            state["error"] = state["error"] or result
                         else:
-                            summary_rows.append(
-                                {
-                                    "symbol": symbol,
-                                    "month": month_key,
-                                    "status": "empty",
-                                    "rows": 0,
-                                    "file": str(out_path),
-                                }
-                            )
-                            print(f"  => {month_key}: brak artykułów, pominięto zapis")
-
-                    time.sleep(request_pause)
-
-            except DailyLimitReached:
-                print("\nDobity dzienny limit Marketaux. Uruchom ponownie jutro.")
-                return pd.DataFrame(summary_rows)
-
-            except Exception as e:
-                month_key_err = "unknown"
-                print(f"ERROR {symbol}: {e}")
-                summary_rows.append(
-                    {
-                        "symbol": symbol,
-                        "month": month_key_err,
-                        "status": "error",
-                        "rows": None,
-                        "file": "",
-                        "error": str(e),
-                    }
-                )
+                            df_day = result[symbol]
+                            record_day(conn, symbol, day, df_day)
+                            state["frames"][day] = df_day
+                            print(f"  {symbol} {day} -> {len(df_day)} artykułów")
+                        state["remaining"] -= 1
+                        if state["remaining"] == 0:
+                            finish_month(symbol, month_key)
+    bucket.close()
+    conn.close()
+
+    if interrupted:
+        print("\nPrzerwano. Pobrane dni są w dzienniku, resume je pominie.")
+    elif stop.is_set():
+        print("\nDobity dzienny limit Marketaux. Uruchom ponownie jutro.")
+    for symbol, month_key in months:
+        summary_rows.append(
+            {
+                "symbol": symbol,
+                "month": month_key,
+                "status": "incomplete",
+                "rows": None,
+                "file": "",
+            }
+        )
 
     return pd.DataFrame(summary_rows)
 
@@ -366,6 +744,7 @@ def main():
     print(f"end_date   = {end_date}")
     print(f"symbols    = {symbols}")
 
+    marketaux = config.get("marketaux", {})
     summary = backfill_symbols_monthly(
         symbols=symbols,
         start_date=start_date,
@@ -373,6 +752,10 @@ def main():
         api_token=api_key,
         out_root=OUT_ROOT,
         resume=True,
+        rate=marketaux.get("rate", 2.0),
+        max_workers=marketaux.get("max_workers", 8),
+        daily_quota=marketaux.get("daily_quota"),
+        batch_size=marketaux.get("batch_size", 1),
     )
 
     summary_path = Path("marketaux_backfill_summary_monthly.csv")
@@ -1,7 +1,22 @@
+import io
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
 import pandas as pd
-from datetime import date
+import requests
+from investment_system.common.http import full_jitter, pooled_session
+from datetime import date, timedelta
 from pathlib import Path
 
+STOOQ_URL = "https://stooq.com/q/d/l/"
+
+
 def stooq_symbol(symbol: str, market: str) -> str:
     symbol = symbol.lower()
     if market == "us":
@@ -12,32 +27,29 @@ def stooq_symbol(symbol: str, market: str) -> str:
         return f"{symbol}"
     raise ValueError(f"Unknown market: {market}")
 
+
 def to_stooq_date(d: date) -> str:
     return d.strftime("%Y%m%d")
 
 
-def fetch_stooq_symbol(
-        symbol: str,
-        market: str,
-        start: date,
-        end: date,) -> pd.DataFrame:
-    
-    stooq_sym = stooq_symbol(symbol, market)
-
-    url = "https://stooq.com/q/d/l/"
-    params = {
-        "s": stooq_sym,
+def stooq_params(symbol: str, market: str, start: date, end: date) -> dict:
+    return {
+        "s": stooq_symbol(symbol, market),
         "i": "d",
         "d1": to_stooq_date(start),
         "d2": to_stooq_date(end),
     }
 
-    query = "&".join(f"{k}={v}" for k, v in params.items())
-    full_url = f"{url}?{query}"
-    df = pd.read_csv(full_url)
+
+class NoDataError(ValueError):
+    pass
+
+
+def parse_stooq_csv(text: str, symbol: str, market: str) -> pd.DataFrame:
+    df = pd.read_csv(io.StringIO(text))
 
     if df.empty:
-        raise ValueError(f"No data returned for {stooq_sym}")
+        raise NoDataError(f"No data returned for {stooq_symbol(symbol, market)}")
 
     df.columns = [c.lower() for c in df.columns]
     df["date"] = pd.to_datetime(df["date"])
@@ -46,61 +58,632 @@ def fetch_stooq_symbol(
 
     return df.sort_values("date").reset_index(drop=True)
 
-def validate_prices(df: pd.DataFrame) -> None:
-    required_columns = ["date", "open", "high", "low", "close", "volume", "symbol", "market"]
-    for col in required_columns:
+
+class RateLimiter:
+    """
+    Spaces requests to the same host at least 1 / rate seconds apart,
+    shared by all threads of a fetcher.
+    """
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError(f"rate must be greater than 0, got: {rate}")
+        self.interval = 1 / rate
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def wait(self, url: str) -> None:
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next.get(host, now))
+            self._next[host] = at + self.interval
+        time.sleep(at - now)
+
+
+def get_text_with_retry(
+    session: requests.Session,
+    url: str,
+    params: dict,
+    limiter: RateLimiter | None = None,
+    timeout: int = 30,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+) -> str:
+    """
+    GET with retries on connection errors, 429 and 5xx, sleeping
+    full_jitter(attempt, backoff) between attempts.
+    """
+    for attempt in range(1, max_retries + 1):
+        if limiter is not None:
+            limiter.wait(url)
+        try:
+            resp = session.get(url, params=params, timeout=timeout)
+            if resp.status_code != 429 and resp.status_code < 500:
+                resp.raise_for_status()
+                return resp.text
+            error = f"HTTP {resp.status_code}"
+        except requests.HTTPError:
+            raise
+        except requests.RequestException as e:
+            error = str(e)
+
+        if attempt == max_retries:
+            raise RuntimeError(f"Request failed after {max_retries} retries: {error}")
+        time.sleep(full_jitter(attempt, backoff))
+
+    raise RuntimeError("Unexpected retry failure.")
+
+
+def fetch_stooq_symbol(
+    symbol: str,
+    market: str,
+    start: date,
+    end: date,
+    session: requests.Session | None = None,
+    limiter: RateLimiter | None = None,
+    base_url: str = STOOQ_URL,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+) -> pd.DataFrame:
+
+    if session is None:
+        with pooled_session(pool_size=1) as own_session:
+            return fetch_stooq_symbol(
+                symbol,
+                market,
+                start,
+                end,
+                session=own_session,
+                limiter=limiter,
+                base_url=base_url,
+                max_retries=max_retries,
+                backoff=backoff,
+            )
+
+    params = stooq_params(symbol, market, start, end)
+    text = get_text_with_retry(
+        session, base_url, params, limiter, max_retries=max_retries, backoff=backoff
+    )
+    return parse_stooq_csv(text, symbol, market)
+
+
+PriceSource = Callable[[str, str, date, date], pd.DataFrame]
+PRICE_SOURCES = ("stooq", "stooq_csv", "replay")
+
+
+def stooq_http_source(
+    session: requests.Session | None = None,
+    limiter: RateLimiter | None = None,
+    base_url: str = STOOQ_URL,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+) -> PriceSource:
+    """
+    Price source reading live from Stooq. A price source is any callable
+    (symbol, market, start, end) -> prices of that symbol in [start, end],
+    raising NoDataError when there are none.
+    """
+    session = session or pooled_session()
+
+    def source(symbol: str, market: str, start: date, end: date) -> pd.DataFrame:
+        return fetch_stooq_symbol(
+            symbol,
+            market,
+            start,
+            end,
+            session=session,
+            limiter=limiter,
+            base_url=base_url,
+            max_retries=max_retries,
+            backoff=backoff,
+        )
+
+    return source
+
+
+def stooq_csv_source(root: Path) -> PriceSource:
+    """
+    Price source reading a local mirror of Stooq downloads: one
+    <stooq symbol>.csv per symbol (e.g. aapl.us.csv) in Stooq's CSV format.
+    source.version(symbol, market) identifies the file contents (mtime and
+    size), so cached_source notices when the mirror is updated.
+    """
+    root = Path(root)
+
+    def csv_path(symbol: str, market: str) -> Path:
+        return root / f"{stooq_symbol(symbol, market)}.csv"
+
+    def source(symbol: str, market: str, start: date, end: date) -> pd.DataFrame:
+        path = csv_path(symbol, market)
+        df = parse_stooq_csv(path.read_text(), symbol, market)
+        df = df[df["date"].between(pd.Timestamp(start), pd.Timestamp(end))]
+        if df.empty:
+            raise NoDataError(f"No data in {path} for {start}..{end}")
+        return df.reset_index(drop=True)
+
+    def version(symbol: str, market: str) -> str:
+        stat = csv_path(symbol, market).stat()
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    source.version = version
+    return source
+
+
+def _read_cache(path: Path) -> tuple[pd.DataFrame, dict] | None:
+    meta_path = path.with_suffix(".json")
+    if not (path.exists() and meta_path.exists()):
+        return None
+    return pd.read_parquet(path), json.loads(meta_path.read_text())
+
+
+def _write_cache(path: Path, df: pd.DataFrame, meta: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    meta_path = path.with_suffix(".json")
+    tmp_meta = meta_path.with_name(f"{meta_path.name}.{threading.get_ident()}.tmp")
+    tmp_meta.write_text(json.dumps(meta))
+    os.replace(tmp_meta, meta_path)
+
+
+def cached_source(cache_dir: Path, source: PriceSource | None = None) -> PriceSource:
+    """
+    Caches the parsed series of every symbol as parquet
+    (<cache_dir>/<market>/<stooq symbol>.parquet, plus a .json with the
+    covered date range and the source version) and serves any request
+    inside the covered range by filtering it in memory. A request reaching
+    past the covered end only fetches the missing days; the cache is
+    refetched when source.version(symbol, market) changes (e.g. an
+    updated CSV mirror). Sources without a version (HTTP) cover at most
+    up to yesterday, so today's bars are always fetched again.
+
+    NoDataError from `source` (which includes Stooq's daily hits limit) is
+    never cached, so the range is asked for again on the next call.
+
+    Without `source` it only replays the cache (offline); a request outside
+    the covered range raises FileNotFoundError.
+    """
+    cache_dir = Path(cache_dir)
+    get_version = getattr(source, "version", None)
+
+    def cached(symbol: str, market: str, start: date, end: date) -> pd.DataFrame:
+        path = cache_dir / market / f"{stooq_symbol(symbol, market)}.parquet"
+        entry = _read_cache(path)
+        version = get_version(symbol, market) if get_version else None
+        if entry is not None and entry[0].empty:
+            # written by an older cache that stored NoData as an empty series
+            entry = None
+        if entry is not None and source is not None and entry[1]["version"] != version:
+            entry = None
+
+        if entry is not None:
+            df, meta = entry
+            covered_start = date.fromisoformat(meta["start"])
+            covered_end = date.fromisoformat(meta["end"])
+        if entry is None or start < covered_start or end > covered_end:
+            if source is None:
+                raise FileNotFoundError(
+                    f"{symbol} ({market}) {start}..{end} is not cached"
+                )
+            fetch_end = end
+            if entry is not None and start >= covered_start:
+                # only the days after the covered range
+                try:
+                    new = source(symbol, market, covered_end + timedelta(days=1), end)
+                except NoDataError:
+                    # not cached as covered: the next call asks again
+                    new = None
+                if new is not None:
+                    df = pd.concat([df, new], ignore_index=True)
+                    df = df.drop_duplicates("date", keep="last").sort_values("date")
+            else:
+                # whole series again, over the union with the covered range
+                if entry is not None:
+                    covered_start = min(start, covered_start)
+                    fetch_end = max(end, covered_end)
+                else:
+                    covered_start = start
+                new = df = source(symbol, market, covered_start, fetch_end)
+            if new is not None:
+                covered_end = fetch_end
+                if version is None:
+                    covered_end = min(fetch_end, date.today() - timedelta(days=1))
+                meta = {
+                    "start": covered_start.isoformat(),
+                    "end": covered_end.isoformat(),
+                    "version": version,
+                }
+                _write_cache(path, df.reset_index(drop=True), meta)
+
+        df = df[df["date"].between(pd.Timestamp(start), pd.Timestamp(end))]
+        if df.empty:
+            raise NoDataError(f"No data for {symbol} ({market}) {start}..{end}")
+        return df.reset_index(drop=True)
+
+    return cached
+
+
+def price_source(cfg: dict) -> PriceSource | None:
+    """
+    Price source configured in cfg["data"]: source is "stooq" (HTTP, the
+    default source, returned as None so fetch_stooq_symbols builds it with
+    its pooled session and rate limiter), "stooq_csv" (data.csv_dir) or
+    "replay" (data.cache_dir only). Caching of "stooq" and "stooq_csv" is
+    applied by fetch_stooq_symbols, see price_cache_dir.
+    """
+    data = cfg.get("data", {})
+    name = data.get("source", "stooq")
+    if name not in PRICE_SOURCES:
+        raise ValueError(f"data.source must be one of {PRICE_SOURCES}, got: {name}")
+
+    if name == "replay":
+        if data.get("cache_dir") is None:
+            raise ValueError("data.cache_dir is required for the replay source")
+        return cached_source(Path(data["cache_dir"]))
+    if name == "stooq_csv":
+        return stooq_csv_source(Path(data["csv_dir"]))
+    return None
+
+
+def price_cache_dir(cfg: dict) -> Path | None:
+    """data.cache_dir for the "stooq" and "stooq_csv" sources (None if unset)."""
+    data = cfg.get("data", {})
+    cache_dir = data.get("cache_dir")
+    if cache_dir is None or data.get("source", "stooq") == "replay":
+        return None
+    return Path(cache_dir)
+
+
+def categorize_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stores symbol and market as categoricals (int codes plus one dictionary
+    of names) instead of a string per row. Categories are kept sorted, so
+    sorting by the codes is sorting by the names.
+    """
+    for col in ("symbol", "market"):
         if col not in df.columns:
-            raise ValueError(f"Missing required column: {col}")
+            continue
+        values = df[col]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            df[col] = values.astype("category")
+        elif not values.cat.categories.is_monotonic_increasing:
+            df[col] = values.cat.reorder_categories(values.cat.categories.sort_values())
+    return df
+
+
+def fetch_stooq_symbols(
+    symbols: list[tuple[str, str]],
+    start: date,
+    end: date,
+    max_workers: int = 16,
+    rate: float = 10.0,
+    base_url: str = STOOQ_URL,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+    since: dict[tuple[str, str], date] | None = None,
+    allow_empty: bool = False,
+    source: PriceSource | None = None,
+    cache_dir: Path | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Fetches (symbol, market) pairs from `source` with a bounded thread pool.
+    The default source is Stooq over HTTP, with one pooled session and one
+    per-host rate limiter (`rate` requests/s) shared by all workers. With
+    cache_dir, the source is wrapped in cached_source.
+    A failing symbol does not stop the others: returns the concatenated
+    prices (in input order) and a report of failures
+    (symbol, market, error).
+
+    `since` overrides start per (symbol, market). With allow_empty=True a
+    symbol without bars in its range is skipped instead of reported.
+    """
+    since = since or {}
+    with pooled_session(pool_size=max_workers) as session:
+        if source is None:
+            source = stooq_http_source(
+                session, RateLimiter(rate), base_url, max_retries, backoff
+            )
+        if cache_dir is not None:
+            source = cached_source(cache_dir, source)
+
+        def fetch(item: tuple[str, str]) -> pd.DataFrame | Exception | None:
+            symbol, market = item
+            try:
+                return source(symbol, market, since.get(item, start), end)
+            except NoDataError as e:
+                return None if allow_empty else e
+            except (requests.RequestException, RuntimeError, ValueError, OSError) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(fetch, symbols))
+
+    frames = []
+    failures = []
+    for (symbol, market), result in zip(symbols, results):
+        if isinstance(result, Exception):
+            failures.append({"symbol": symbol, "market": market, "error": str(result)})
+        elif result is not None:
+            frames.append(result)
+
+    prices = pd.DataFrame()
+    if frames:
+        prices = categorize_prices(pd.concat(frames, ignore_index=True))
+    report = pd.DataFrame(failures, columns=["symbol", "market", "error"])
+    return prices, report
+
+
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "volume", "symbol", "market"]
+VALIDATE_PRICE_MODES = ("strict", "report", "skip")
+# rule -> error raised in strict mode, in the order the rules are checked
+PRICE_RULES = {
+    "null_price": "Price columns contain null values",
+    "high_below_low": "High price is less than low price for some records",
+    "non_positive_price": "Price columns contain negative values or equals zero",
+    "negative_volume": "Volume column contains negative values",
+    "high_below_open_close": "High is lower than open/close for some rows",
+    "low_above_open_close": "Low is higher than open/close for some rows",
+    "duplicate_key": "Duplicate (market, symbol, date) rows detected",
+}
+
 
-    if df[["date", "open", "close"]].isnull().any().any():
-        raise ValueError("Price columns contain null values")
+def price_violations(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    Row positions violating each of PRICE_RULES, from one pass over the
+    price arrays (NaN prices only count as null_price, like pandas
+    comparisons). Duplicates are every occurrence of a (date, symbol,
+    market) key after the first one.
+    """
+    dates = df["date"].to_numpy(dtype="datetime64[ns]")
+    open_, high, low, close, volume = (
+        df[col].to_numpy(dtype="float64")
+        for col in ("open", "high", "low", "close", "volume")
+    )
+    open_close_max = np.fmax(open_, close)
+    open_close_min = np.fmin(open_, close)
 
-    if (df["high"] < df["low"]).any():
-        raise ValueError("High price is less than low price for some records")
+    masks = {
+        "null_price": np.isnat(dates) | np.isnan(open_) | np.isnan(close),
+        "high_below_low": high < low,
+        "non_positive_price": np.fmin(open_close_min, np.fmin(high, low)) <= 0,
+        "negative_volume": volume < 0,
+        "high_below_open_close": high < open_close_max,
+        "low_above_open_close": low > open_close_min,
+    }
+
+    # stable sort by (market, symbol, date): equal keys keep their order,
+    # so a row equal to its predecessor is a later duplicate
+    market = pd.factorize(df["market"])[0]
+    symbol = pd.factorize(df["symbol"])[0]
+    key = market.astype("int64") * (symbol.max(initial=0) + 1) + symbol
+    order = np.lexsort((dates.view("int64"), key))
+    same = (key[order][1:] == key[order][:-1]) & (dates[order][1:] == dates[order][:-1])
+    duplicate = np.zeros(len(df), dtype=bool)
+    duplicate[order[1:][same]] = True
+    masks["duplicate_key"] = duplicate
 
-    if (df["open"] <= 0).any() or (df["high"] <= 0).any() or (df["low"] <= 0).any() or (df["close"] <= 0).any():
-        raise ValueError("Price columns contain negative values or equals zero")
+    return {rule: np.flatnonzero(mask) for rule, mask in masks.items()}
 
-    if (df["volume"] < 0).any():
-        raise ValueError("Volume column contains negative values")
-    
-    if (df["high"] < df[["open", "close"]].max(axis=1)).any():
-        raise ValueError("High is lower than open/close for some rows")
 
-    if (df["low"] > df[["open", "close"]].min(axis=1)).any():
-        raise ValueError("Low is higher than open/close for some rows")
-    
-    if df.duplicated(["date", "symbol", "market"]).any():
-        raise ValueError("Duplicate (market, symbol, date) rows detected")    
+def validate_prices(df: pd.DataFrame, mode: str = "strict") -> dict[str, np.ndarray]:
+    """
+    Checks the price frame against PRICE_RULES.
 
+    mode="strict" raises ValueError for the first violated rule, "report"
+    returns {rule: violating row positions} for the violated rules without
+    raising, "skip" does no checks. Missing columns always raise.
+    """
+    if mode not in VALIDATE_PRICE_MODES:
+        raise ValueError(f"mode must be one of {VALIDATE_PRICE_MODES}, got: {mode}")
+    if mode == "skip":
+        return {}
+    for col in PRICE_COLUMNS:
+        if col not in df.columns:
+            raise ValueError(f"Missing required column: {col}")
 
-def fetch_stooq_universe(cfg: dict) -> pd.DataFrame:
+    report = {rule: rows for rule, rows in price_violations(df).items() if len(rows)}
+    if mode == "strict" and report:
+        raise ValueError(PRICE_RULES[next(iter(report))])
+    return report
+
+
+def fetch_stooq_universe(
+    cfg: dict,
+    max_workers: int = 16,
+    rate: float = 10.0,
+    base_url: str = STOOQ_URL,
+    source: PriceSource | None = None,
+) -> pd.DataFrame:
+    """
+    Fetches the us and pl universe concurrently from `source` (by default
+    the one configured in cfg["data"], see price_source). Symbols that
+    failed are printed and listed in df.attrs["failures"]
+    (symbol, market, error); raises if nothing was fetched.
+    """
+    cache_dir = price_cache_dir(cfg) if source is None else None
+    source = source or price_source(cfg)
     start = date.fromisoformat(cfg["dates"]["start"])
     end = date.fromisoformat(cfg["dates"]["end"])
 
-    frames = []
+    symbols = [(symbol, "us") for symbol in cfg["universe"]["us"]]
+    symbols += [(symbol, "pl") for symbol in cfg["universe"]["pl"]]
 
-    for symbol in cfg["universe"]["us"]:
-        frames.append(fetch_stooq_symbol(symbol, "us", start, end))
-
-    for symbol in cfg["universe"]["pl"]:
-        frames.append(fetch_stooq_symbol(symbol, "pl", start, end))
+    df, failures = fetch_stooq_symbols(
+        symbols,
+        start,
+        end,
+        max_workers=max_workers,
+        rate=rate,
+        base_url=base_url,
+        source=source,
+        cache_dir=cache_dir,
+    )
+    if df.empty:
+        raise RuntimeError(f"No symbol could be downloaded:\n{failures}")
+    for row in failures.itertuples():
+        print(f"FAILED {row.symbol} ({row.market}): {row.error}")
 
-    df = pd.concat(frames, ignore_index=True)
     validate_prices(df)
+    df.attrs["failures"] = failures.to_dict("records")
 
     return df
 
 
-def save_prices(df: pd.DataFrame, path: Path) -> None:
-    """Saves prices DataFrame to Parquet file."""
+PARTITION_COLUMNS = ["market", "symbol"]
+PRICE_ROW_GROUP_SIZE = 100_000
+
+
+def _write_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Writes next to the target and renames over it (never a partial file)."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(path, index=False)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    df.to_parquet(tmp_path, index=False, row_group_size=PRICE_ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
 
-def load_prices(path: Path) -> pd.DataFrame:
-    """Load prices from parquet to DataFrame"""
-    df = pd.read_parquet(path)
-    validate_prices(df)
+
+def partition_path(root: Path, market: str, symbol: str) -> Path:
+    return root / f"market={market}" / f"symbol={symbol}" / "part-0.parquet"
+
+
+def save_prices(df: pd.DataFrame, path: Path) -> None:
+    """
+    Saves prices sorted by (symbol, date), so row-group statistics let
+    readers skip symbols and date ranges.
+
+    A path ending in .parquet is one file; any other path is a directory
+    partitioned market=<market>/symbol=<symbol> (Hive layout) with one file
+    per symbol. Every file is replaced atomically; partitions of symbols no
+    longer in df are removed.
+    """
+    df = df.sort_values(["symbol", "date"]).reset_index(drop=True)
+    if path.suffix == ".parquet":
+        _write_parquet(df, path)
+        return
+
+    written = set()
+    for (market, symbol), part in df.groupby(
+        PARTITION_COLUMNS, sort=False, observed=True
+    ):
+        part_path = partition_path(path, market, symbol)
+        _write_parquet(part.drop(columns=PARTITION_COLUMNS), part_path)
+        written.add(part_path)
+    for stale in path.glob("market=*/symbol=*/part-0.parquet"):
+        if stale not in written:
+            stale.unlink()
+            stale.parent.rmdir()
+
+
+def load_prices(
+    path: Path,
+    symbols: list[str] | None = None,
+    start: date | str | None = None,
+    end: date | str | None = None,
+    columns: list[str] | None = None,
+    validate: str = "strict",
+) -> pd.DataFrame:
+    """
+    Load prices from a parquet file or a partitioned price directory.
+
+    symbols / start / end (inclusive) are pushed down to the parquet reader
+    (partition pruning and row-group statistics), columns limits what is
+    read. When all price columns are loaded the frame is checked with
+    validate_prices(df, validate); validate="skip" avoids the cost for
+    files written by save_prices after validation.
+    """
+    filters = []
+    if symbols is not None:
+        filters.append(("symbol", "in", list(symbols)))
+    if start is not None:
+        filters.append(("date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date", "<=", pd.Timestamp(end)))
+
+    df = pd.read_parquet(path, columns=columns, filters=filters or None)
+    df = categorize_prices(df)
+    if columns is None:
+        validate_prices(df, validate)
     return df
 
 
+PRICE_KEY = ["date", "symbol", "market"]
+
+
+def last_stored_dates(df: pd.DataFrame) -> dict[tuple[str, str], date]:
+    """Last stored date per (symbol, market)."""
+    last = df.groupby(["symbol", "market"], observed=True)["date"].max()
+    return {key: value.date() for key, value in last.items()}
+
+
+def merge_prices(stored: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Appends new bars to stored ones. Rows with the same (date, symbol,
+    market) keep the newly downloaded values. Sorted by (symbol, date).
+    """
+    if new.empty:
+        return stored
+    df = pd.concat([stored, new], ignore_index=True)
+    df = categorize_prices(df.drop_duplicates(PRICE_KEY, keep="last"))
+    return df.sort_values(["symbol", "date"]).reset_index(drop=True)
+
+
+def update_prices(
+    path: Path,
+    cfg: dict,
+    max_workers: int = 16,
+    rate: float = 10.0,
+    base_url: str = STOOQ_URL,
+    source: PriceSource | None = None,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Incremental refresh of the price file: every configured symbol is
+    requested only for (last stored date, dates.end], symbols not stored
+    yet for the full dates.start..dates.end range. Dates before the last
+    stored one are not backfilled. Returns the merged prices and the number
+    of new rows; the file is replaced atomically.
+    """
+    if not path.exists():
+        df = fetch_stooq_universe(cfg, max_workers, rate, base_url, source)
+        save_prices(df, path)
+        return df, len(df)
+
+    cache_dir = price_cache_dir(cfg) if source is None else None
+    source = source or price_source(cfg)
+
+    start = date.fromisoformat(cfg["dates"]["start"])
+    end = date.fromisoformat(cfg["dates"]["end"])
+    stored = load_prices(path)
+    last = last_stored_dates(stored)
+
+    symbols = [(symbol, "us") for symbol in cfg["universe"]["us"]]
+    symbols += [(symbol, "pl") for symbol in cfg["universe"]["pl"]]
+    since = {
+        (symbol, market): last[(symbol.upper(), market)] + timedelta(days=1)
+        for symbol, market in symbols
+        if (symbol.upper(), market) in last
+    }
+    symbols = [item for item in symbols if since.get(item, start) <= end]
+
+    new, failures = fetch_stooq_symbols(
+        symbols,
+        start,
+        end,
+        max_workers=max_workers,
+        rate=rate,
+        base_url=base_url,
+        since=since,
+        allow_empty=True,
+        source=source,
+        cache_dir=cache_dir,
+    )
+    for row in failures.itertuples():
+        print(f"FAILED {row.symbol} ({row.market}): {row.error}")
+    if new.empty:
+        return stored, 0
+
+    validate_prices(new)
+    df = merge_prices(stored, new)
+    validate_prices(df)
+    save_prices(df, path)
+    return df, len(df) - len(stored)
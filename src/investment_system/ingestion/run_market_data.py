@@ -2,15 +2,31 @@ from pathlib import Path
 
 from investment_system.common.paths import RAW_DIR
 from investment_system.common.config import load_config
-from investment_system.ingestion.market_data import fetch_stooq_universe, save_prices
+from investment_system.ingestion.market_data import (
+    fetch_stooq_universe,
+    save_prices,
+    update_prices,
+)
 
-def main() -> None:
+def main(incremental: bool = True) -> None:
+    """
+    incremental=True downloads only bars after the last stored date of each
+    symbol and merges them into prices.parquet; False re-downloads the full
+    configured range and overwrites the file.
+    """
     cfg = load_config(Path("configs/base.yaml"))
-    df = fetch_stooq_universe(cfg)
     out_path = RAW_DIR / "prices.parquet"
+    if incremental:
+        df, n_new = update_prices(out_path, cfg)
+        print(f"Updated prices: {out_path} | rows={len(df)} | new rows={n_new}")
+        return
+
+    df = fetch_stooq_universe(cfg)
     save_prices(df, out_path)
 
     print(f"Saved prices to: {out_path} | rows={len(df)}")
+    if df.attrs.get("failures"):
+        print(f"Failed symbols: {len(df.attrs['failures'])}")
 
 if __name__ == "__main__":
     main()
@@ -2,32 +2,80 @@ from dotenv import load_dotenv
 import os
 import pandas as pd
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import io
 import json
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+
+# columns extract_sentiment needs; the article text is never read.
+# sentiment_score (the requested symbol's score, flattened at download time)
+# is missing from older files and then parsed from entities_json
+NEWS_COLUMNS = ["published_at", "requested_symbol", "entities_json", "sentiment_score"]
+# only these entity fields are decoded, everything else is skipped
+ENTITY_SCHEMA = pa.schema(
+    [
+        (
+            "entities",
+            pa.list_(
+                pa.struct([("symbol", pa.string()), ("sentiment_score", pa.float64())])
+            ),
+        )
+    ]
+)
 
-def load_news(path: Path) -> pd.DataFrame:
 
-    df = pd.read_parquet(path)
+def load_news(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """Reads `columns` of a news file; columns the file does not have are skipped."""
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [col for col in columns if col in available]
+    df = pd.read_parquet(path, columns=columns)
     return df
 
 
-def load_symbol_news(data_root: Path, symbol: str) -> pd.DataFrame:
-    path = Path(data_root) / symbol
-    data = Path(path).glob("*.parquet")
-    df = pd.DataFrame()
-    for month in data:
-        one_month = load_news(month)
-        df = pd.concat([df, one_month], ignore_index=True)
-    return df
+def news_files(data_root: Path, symbols: list[str] | None = None) -> list[Path]:
+    """Monthly files <data_root>/<symbol>/YYYY-MM.parquet, sorted by path."""
+    data_root = Path(data_root)
+    if symbols is None:
+        return sorted(data_root.glob("*/*.parquet"))
+    return sorted(
+        path for symbol in symbols for path in (data_root / symbol).glob("*.parquet")
+    )
 
 
-def load_all_symbols_news(data_root: Path) -> pd.DataFrame:
-    paths = Path(data_root).iterdir()
-    symbols = [path.name for path in paths if path.is_dir()]
-    df = pd.DataFrame()
-    for symbol in symbols:
-        df = pd.concat([df, load_symbol_news(data_root, symbol)], ignore_index=True)
-    return df
+def load_news_files(
+    paths: list[Path], columns: list[str] | None = None, max_workers: int = 8
+) -> pd.DataFrame:
+    """
+    Reads the files in parallel (parquet decoding releases the GIL) and
+    concatenates them once, in the order of `paths`.
+    """
+    if not paths:
+        return pd.DataFrame(columns=columns)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = list(pool.map(lambda path: load_news(path, columns), paths))
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_symbol_news(
+    data_root: Path,
+    symbol: str,
+    columns: list[str] | None = None,
+    max_workers: int = 8,
+) -> pd.DataFrame:
+    return load_news_files(news_files(data_root, [symbol]), columns, max_workers)
+
+
+def load_all_symbols_news(
+    data_root: Path, columns: list[str] | None = None, max_workers: int = 8
+) -> pd.DataFrame:
+    return load_news_files(news_files(data_root), columns, max_workers)
 
 
 def _parse_entities(x):
@@ -48,16 +96,85 @@ def _get_sentiment_for_requested_symbol(entities, requested_symbol):
     return None
 
 
+def _entity_rows(entities_json: pd.Series) -> tuple[list, list, list]:
+    """Per-row json.loads fallback of entity_sentiment_table."""
+    articles, symbols, scores = [], [], []
+    for article, value in enumerate(entities_json):
+        for entity in _parse_entities(value):
+            if isinstance(entity, dict):
+                articles.append(article)
+                symbols.append(entity.get("symbol"))
+                scores.append(entity.get("sentiment_score"))
+    return articles, symbols, scores
+
+
+def entity_sentiment_table(entities_json: pd.Series) -> pd.DataFrame:
+    """
+    Flat (article, symbol, sentiment_score) table of all entities, with
+    article the row position in entities_json. All rows are parsed by one
+    Arrow JSON read that decodes only symbol and sentiment_score; if any
+    row is not a valid entity list, falls back to json.loads per row.
+    """
+    try:
+        texts = entities_json.fillna("[]").astype(str)
+        lines = ('{"entities":' + texts + "}").str.cat(sep="\n")
+        options = pa_json.ParseOptions(
+            explicit_schema=ENTITY_SCHEMA, unexpected_field_behavior="ignore"
+        )
+        table = pa_json.read_json(io.BytesIO(lines.encode()), parse_options=options)
+        entities = table.column("entities").combine_chunks()
+        if len(entities) != len(entities_json):
+            raise ValueError("Entity rows do not match articles")
+        flat = pc.list_flatten(entities)
+        articles = pc.list_parent_indices(entities).to_numpy()
+        symbols = flat.field("symbol").to_numpy(zero_copy_only=False)
+        scores = flat.field("sentiment_score").to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, ValueError):
+        articles, symbols, scores = _entity_rows(entities_json)
+
+    return pd.DataFrame(
+        {
+            "article": np.asarray(articles, dtype="int64"),
+            "symbol": np.asarray(symbols, dtype=object),
+            "sentiment_score": np.asarray(scores, dtype="float64"),
+        }
+    )
+
+
+def requested_symbol_sentiment(
+    entities_json: pd.Series, requested_symbol: pd.Series
+) -> np.ndarray:
+    """
+    Sentiment score of the first entity matching the requested symbol of
+    each article (NaN when there is none), joined on the flat entity table.
+    """
+    flat = entity_sentiment_table(entities_json)
+    requested = requested_symbol.to_numpy(dtype=object)[flat["article"].to_numpy()]
+    matches = flat[flat["symbol"].to_numpy() == requested]
+    first = matches.drop_duplicates("article")
+
+    scores = np.full(len(entities_json), np.nan)
+    scores[first["article"].to_numpy()] = first["sentiment_score"].to_numpy()
+    return scores
+
+
 def extract_sentiment(df: pd.DataFrame) -> pd.DataFrame:
     df2 = pd.DataFrame(index=df.index)
     df2["date"] = pd.to_datetime(df["published_at"], errors="coerce").dt.date
     df2["symbol"] = df["requested_symbol"]
 
-    parsed_entities = df["entities_json"].apply(_parse_entities)
-    df2["sentiment_score"] = [
-        _get_sentiment_for_requested_symbol(entities, requested_symbol)
-        for entities, requested_symbol in zip(parsed_entities, df["requested_symbol"])
-    ]
+    # scores flattened at download time; entities_json is parsed only for
+    # rows without one (older files)
+    scores = np.full(len(df), np.nan)
+    if "sentiment_score" in df.columns:
+        scores = pd.to_numeric(df["sentiment_score"], errors="coerce")
+        scores = scores.to_numpy(dtype="float64", copy=True)
+    missing = np.isnan(scores)
+    if missing.any():
+        scores[missing] = requested_symbol_sentiment(
+            df["entities_json"][missing], df["requested_symbol"][missing]
+        )
+    df2["sentiment_score"] = scores
 
     return df2
 
@@ -69,7 +186,7 @@ def get_daily_sentiment(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def build_sentiment_pipeline(data_root: Path) -> pd.DataFrame:
-    df = load_all_symbols_news(data_root)
+    df = load_all_symbols_news(data_root, columns=NEWS_COLUMNS)
     df = extract_sentiment(df)
     df = get_daily_sentiment(df)
     return df
@@ -1,7 +1,11 @@
 import pandas as pd
+from functools import partial
 from pathlib import Path
 import investment_system.ingestion.market_data as dt
+import investment_system.ingestion.corporate_actions as ca
 import investment_system.features.price_features as pf
+import investment_system.features.feature_cache as fc
+from investment_system.features.feature_graph import resolve_features
 
 
 def make_dataset_from_parquet(
@@ -11,12 +15,35 @@ def make_dataset_from_parquet(
     symbol_column: str = "symbol",
     date_column: str = "date",
     close_column: str = "close",
+    dtype: str = "float64",
+    keep_intermediates: bool = True,
+    columns: list[str] | None = None,
+    n_jobs: int = 1,
+    cache_dir: Path | None = fc.FEATURE_CACHE_DIR,
+    symbols: list[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    events_path: Path | None = None,
 ) -> pd.DataFrame:
-    df = dt.load_prices(path)
+    """
+    Dataset from a price file or partitioned price directory; symbols and
+    start/end are pushed down to the parquet reader (see load_prices).
+    With events_path, prices are split/dividend adjusted before the
+    features are computed (see corporate_actions).
+    """
+    df = dt.load_prices(path, symbols=symbols, start=start, end=end)
+    if events_path is not None:
+        df = ca.adjust_prices(df, ca.load_corporate_actions(events_path))
     df = make_dataset(
         df,
         sentiment_data_root,
         rolling_windows,
+        inplace=True,
+        dtype=dtype,
+        keep_intermediates=keep_intermediates,
+        columns=columns,
+        n_jobs=n_jobs,
+        cache_dir=cache_dir,
     )
     return df
 
@@ -24,6 +51,10 @@ def make_dataset_from_parquet(
 def merge_sentiment_and_price(
     df_price: pd.DataFrame, df_sentiment: pd.DataFrame
 ) -> pd.DataFrame:
+    symbol_dtype = df_price["symbol"].dtype
+    if isinstance(symbol_dtype, pd.CategoricalDtype):
+        # keep the compact symbol column (a str key would turn it into strings)
+        df_sentiment = df_sentiment.astype({"symbol": symbol_dtype})
     return df_price.merge(df_sentiment, on=("symbol", "date"), how="left").fillna(0)
 
 
@@ -31,9 +62,37 @@ def make_dataset(
     data: pd.DataFrame,
     data_root: Path,
     rolling_windows: tuple[int, ...],
+    inplace: bool = False,
+    validate: str = "full",
+    dtype: str = "float64",
+    keep_intermediates: bool = True,
+    columns: list[str] | None = None,
+    n_jobs: int = 1,
+    cache_dir: Path | None = None,
 ) -> pd.DataFrame:
-    df = data.copy()
-    df = pf.add_price_features(df, rolling_windows)
+    """
+    Price features merged with sentiment. `columns` may mix price feature
+    columns and sentiment_score; only the price features they depend on
+    (see feature_graph) are computed. With cache_dir, price features are
+    read from / stored in the feature cache (see feature_cache).
+    """
+    if columns is not None:
+        resolve_features(columns, rolling_windows)
+        price_columns = pf.price_feature_columns(rolling_windows)
+        columns = [col for col in columns if col in price_columns]
+    add_features = pf.add_price_features
+    if cache_dir is not None:
+        add_features = partial(fc.cached_price_features, cache_dir=cache_dir)
+    df = add_features(
+        data,
+        rolling_windows,
+        inplace=inplace,
+        validate=validate,
+        dtype=dtype,
+        keep_intermediates=keep_intermediates,
+        columns=columns,
+        n_jobs=n_jobs,
+    )
     df_sentiment = pd.read_parquet(data_root)
     df = merge_sentiment_and_price(df, df_sentiment)
     return df
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from investment_system.features.cross_sectional import cross_sectional_rank, date_codes
+from investment_system.common.trading_calendar import rebalance_mask
 
 
 def _baseline_windows(windows: tuple[int, ...]) -> tuple[int, int]:
@@ -19,7 +21,9 @@ def add_baseline_score(
         / (df[f"px_log_return_volatility_{signal_window}"] + 1e-12)
     )
 
-    df["rank"] = df.groupby("date")["score"].rank(ascending=False)
+    df["rank"] = cross_sectional_rank(
+        df["score"], date_codes(df["date"]), ascending=False
+    )
 
     return df
 
@@ -53,7 +57,9 @@ def add_baseline_signal_hold(
 
 def add_baseline_position(df: pd.DataFrame) -> pd.DataFrame:
     df = df.sort_values(["symbol", "date"])
-    df["position"] = df.groupby("symbol")["signal_hold"].shift(1).fillna(0)
+    df["position"] = (
+        df.groupby("symbol", observed=True)["signal_hold"].shift(1).fillna(0)
+    )
     return df
 
 
@@ -69,6 +75,7 @@ def add_rebalance_signal_hold(
     holding_period: int,
     windows: tuple[int, ...] = (1, 5, 15),
     score_threshold: float | None = None,
+    calendar: pd.DatetimeIndex | None = None,
 ) -> pd.DataFrame:
     if holding_period <= 0:
         raise ValueError("holding_period must be greater than 0.")
@@ -89,16 +96,16 @@ def add_rebalance_signal_hold(
         & (df["rank"] <= top_k)
     )
 
-    dates = pd.Series(df["date"].drop_duplicates().sort_values().to_numpy())
-    rebalance_dates = set(dates.iloc[::holding_period])
-    df["rebalance_day"] = df["date"].isin(rebalance_dates)
+    df["rebalance_day"] = rebalance_mask(df["date"], holding_period, calendar)
     df["signal_decision"] = np.where(
         df["rebalance_day"],
         np.where(cond, 1, 0),
         np.nan,
     )
     df = df.sort_values(["symbol", "date"]).reset_index(drop=True)
-    df["signal_hold"] = df.groupby("symbol")["signal_decision"].ffill().fillna(0)
+    df["signal_hold"] = (
+        df.groupby("symbol", observed=True)["signal_decision"].ffill().fillna(0)
+    )
     return df
 
 
@@ -108,9 +115,12 @@ def run_baseline_strategy(
     holding_period: int = 1,
     windows: tuple[int, ...] = (1, 5, 15),
     score_threshold: float | None = None,
+    calendar: pd.DatetimeIndex | None = None,
 ) -> pd.DataFrame:
     df = add_baseline_score(df.copy(), windows)
-    df = add_rebalance_signal_hold(df, top_k, holding_period, windows, score_threshold)
+    df = add_rebalance_signal_hold(
+        df, top_k, holding_period, windows, score_threshold, calendar
+    )
     df = add_baseline_position(df)
     df = add_equal_weight_from_position(df)
     return df
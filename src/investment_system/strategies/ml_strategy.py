@@ -1,16 +1,23 @@
 import pandas as pd
 import numpy as np
+from investment_system.features.cross_sectional import cross_sectional_rank, date_codes
+from investment_system.common.trading_calendar import rebalance_mask
 
 
-def rebalance_day(df: pd.DataFrame, holding_period: int) -> pd.DataFrame:
+def rebalance_day(
+    df: pd.DataFrame,
+    holding_period: int,
+    calendar: pd.DatetimeIndex | None = None,
+) -> pd.DataFrame:
     df = df.sort_values("date")
-    mask = (pd.factorize(df["date"])[0]%(holding_period) == 0)
-    df["rebalance_day"] = np.where(mask, True, False)
+    df["rebalance_day"] = rebalance_mask(df["date"], holding_period, calendar)
     return df
 
 
 def ml_rank(df: pd.DataFrame) -> pd.DataFrame:
-    df["rank"] = df.groupby("date")["score"].rank(ascending=False)
+    df["rank"] = cross_sectional_rank(
+        df["score"], date_codes(df["date"]), ascending=False
+    )
 
     return df
 
@@ -30,12 +37,16 @@ def signal_decision(df: pd.DataFrame, top_k: int) -> pd.DataFrame:
     return df
 
 def add_signal_hold(df: pd.DataFrame) -> pd.DataFrame:
-    df["signal_hold"] = df.groupby("symbol")["signal_decision"].ffill().fillna(0)
+    df["signal_hold"] = (
+        df.groupby("symbol", observed=True)["signal_decision"].ffill().fillna(0)
+    )
     return df
 
 
 def add_position(df: pd.DataFrame) -> pd.DataFrame:
-    df["position"] = df.groupby("symbol")["signal_hold"].shift(1).fillna(0)
+    df["position"] = (
+        df.groupby("symbol", observed=True)["signal_hold"].shift(1).fillna(0)
+    )
     return df
 
 def add_weight_hold(df: pd.DataFrame, top_k: int) -> pd.DataFrame:
@@ -53,14 +64,21 @@ def add_weight_hold(df: pd.DataFrame, top_k: int) -> pd.DataFrame:
     sum_score = df.groupby("date")["target_weight"].transform("sum")
     df.loc[mask, "target_weight"] = df.loc[mask, "target_weight"]/sum_score[mask]
     df["weight_hold"] = df["target_weight"]
-    df["weight_hold"] = df.groupby("symbol")["target_weight"].ffill().fillna(0)
-    df["weight"] = df.groupby("symbol")["weight_hold"].shift().fillna(0)
+    df["weight_hold"] = (
+        df.groupby("symbol", observed=True)["target_weight"].ffill().fillna(0)
+    )
+    df["weight"] = df.groupby("symbol", observed=True)["weight_hold"].shift().fillna(0)
 
     return df
 
-def run_ml_strategy(df: pd.DataFrame, holding_period, top_k) -> pd.DataFrame:
+def run_ml_strategy(
+    df: pd.DataFrame,
+    holding_period,
+    top_k,
+    calendar: pd.DatetimeIndex | None = None,
+) -> pd.DataFrame:
     df = df.sort_values(["symbol","date"]).reset_index(drop=True)
-    df = rebalance_day(df, holding_period)
+    df = rebalance_day(df, holding_period, calendar)
     df = ml_rank(df)
     df = signal_decision(df, top_k)
     df = add_signal_hold(df)
@@ -1,5 +1,9 @@
 import pandas as pd
 import numpy as np
+from investment_system.features.cross_sectional import (
+    cross_sectional_demean,
+    date_codes,
+)
 from investment_system.features.price_features import sort_data
 
 
@@ -25,8 +29,8 @@ def make_log_return_target(
     if horizon <= 0:
         raise ValueError("Horizon value must be greater than 0")
 
-    entry_price = out.groupby(symbol_col)["open"].shift(-1)
-    future_price = out.groupby(symbol_col)[close_col].shift(-horizon)
+    entry_price = out.groupby(symbol_col, observed=True)["open"].shift(-1)
+    future_price = out.groupby(symbol_col, observed=True)[close_col].shift(-horizon)
 
     target_col = f"target_log_ret_{horizon}d"
     if target_col in out.columns:
@@ -40,7 +44,7 @@ def make_log_return_target(
 
 def add_target_excess(df: pd.DataFrame, horizon) -> pd.DataFrame:
 
-    df["target_excess"] = df[f"target_log_ret_{horizon}d"] - df.groupby("date")[
-        f"target_log_ret_{horizon}d"
-    ].transform("mean")
+    df["target_excess"] = cross_sectional_demean(
+        df[f"target_log_ret_{horizon}d"], date_codes(df["date"])
+    )
     return df
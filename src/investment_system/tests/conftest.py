@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def make_prices():
+    """
+    Factory of synthetic daily prices: a geometric random walk of
+    `periods` business days per symbol from 2024-01-01, with open/high/low
+    around the close and constant volume, in shuffled row order (like an
+    unsorted input). `markets` (symbol -> market) adds a market column.
+    """
+
+    def make(
+        lengths: dict[str, int],
+        seed: int = 0,
+        volatility: float = 0.02,
+        markets: dict[str, str] | None = None,
+    ) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        frames = []
+        for symbol, periods in lengths.items():
+            close = 100 * np.exp(np.cumsum(rng.normal(0, volatility, periods)))
+            frame = pd.DataFrame(
+                {
+                    "symbol": symbol,
+                    "date": pd.date_range("2024-01-01", periods=periods, freq="B"),
+                    "open": close * 1.01,
+                    "high": close * 1.02,
+                    "low": close * 0.98,
+                    "close": close,
+                    "volume": 1000.0,
+                }
+            )
+            if markets is not None:
+                frame.insert(1, "market", markets[symbol])
+            frames.append(frame)
+        return pd.concat(frames).sample(frac=1, random_state=seed)
+
+    return make
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from investment_system.features.price_features import add_price_features
+from investment_system.ingestion.corporate_actions import (
+    adjust_prices,
+    load_corporate_actions,
+    readjust_symbols,
+    unadjust_prices,
+)
+
+
+@pytest.fixture
+def prices(make_prices):
+    return make_prices({"AAPL": 40, "MSFT": 30, "NVDA": 25}, seed=11, volatility=0.01)
+
+
+events = pd.DataFrame(
+    {
+        "symbol": ["AAPL", "AAPL", "MSFT", "NVDA", "TSLA"],
+        "date": pd.to_datetime(
+            ["2024-01-15", "2024-02-01", "2024-01-10", "2023-12-01", "2024-01-10"]
+        ),
+        "type": ["split", "dividend", "dividend", "split", "split"],
+        "value": [4.0, 1.5, 2.0, 2.0, 3.0],
+    }
+)
+
+
+def reference_factors(raw: pd.DataFrame, events: pd.DataFrame) -> np.ndarray:
+    factors = np.ones(len(raw))
+    for event in events.itertuples():
+        before = (
+            (raw["symbol"] == event.symbol) & (raw["date"] < event.date)
+        ).to_numpy()
+        if not before.any():
+            continue
+        if event.type == "split":
+            factors[before] /= event.value
+        else:
+            factors[before] *= 1 - event.value / raw.loc[before, "close"].iloc[-1]
+    return factors
+
+
+def test_adjust_prices_match_reference(prices):
+    raw = prices.sort_values(["symbol", "date"]).reset_index(drop=True)
+    df = adjust_prices(prices, events)
+    expected = reference_factors(raw, events)
+
+    np.testing.assert_allclose(df["adj_factor"], expected)
+    for col in ["open", "high", "low", "close"]:
+        np.testing.assert_allclose(df[col], raw[col] * expected)
+    # the split is volume-adjusted, the dividend is not
+    aapl = df[df["symbol"] == "AAPL"]
+    assert set(aapl["volume"]) == {1000.0, 4000.0}
+    # events before the history or of unknown symbols change nothing
+    assert (df.loc[df["symbol"] == "NVDA", "adj_factor"] == 1).all()
+
+
+def test_adjust_prices_without_rows(prices):
+    # e.g. a symbol filter that matches nothing
+    df = adjust_prices(prices[prices["symbol"] == "TSLA"], events)
+    assert df.empty
+    assert {"adj_factor", "adj_split_factor"} <= set(df.columns)
+
+
+def test_split_is_not_a_return(prices):
+    raw = prices[prices["symbol"] == "AAPL"].sort_values("date").copy()
+    split_day = raw["date"] >= "2024-01-15"
+    raw.loc[split_day, ["open", "high", "low", "close"]] /= 4
+    adjusted = adjust_prices(raw, events[events["type"] == "split"])
+
+    raw_returns = add_price_features(raw, (5,))["log_return"]
+    returns = add_price_features(adjusted, (5,))["log_return"]
+    assert raw_returns.min() < np.log(0.3)
+    assert returns.abs().max() < 0.1
+
+
+def test_unadjust_prices_roundtrip(prices):
+    raw = prices.sort_values(["symbol", "date"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(unadjust_prices(adjust_prices(prices, events)), raw)
+
+
+def test_readjust_symbols_matches_full_adjustment(prices):
+    adjusted = adjust_prices(prices, events)
+    new_event = pd.DataFrame(
+        {
+            "symbol": ["MSFT"],
+            "date": [pd.Timestamp("2024-01-22")],
+            "type": ["split"],
+            "value": [5.0],
+        }
+    )
+    all_events = pd.concat([events, new_event], ignore_index=True)
+
+    df = readjust_symbols(adjusted, all_events, ["MSFT"])
+    pd.testing.assert_frame_equal(df, adjust_prices(prices, all_events))
+
+
+def test_load_corporate_actions(tmp_path):
+    path = tmp_path / "events.csv"
+    events.to_csv(path, index=False)
+    pd.testing.assert_frame_equal(load_corporate_actions(path), events)
+
+    events.assign(type="merger").to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        load_corporate_actions(path)
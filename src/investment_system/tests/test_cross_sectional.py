@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from investment_system.features.cross_sectional import (
+    add_cross_sectional_features,
+    cross_sectional_rank,
+    date_codes,
+)
+
+rng = np.random.default_rng(3)
+n = 500
+data = pd.DataFrame(
+    {
+        "date": pd.Timestamp("2024-01-01")
+        + pd.to_timedelta(rng.integers(0, 20, n), unit="D"),
+        "score": np.round(rng.normal(0, 1, n), 1),
+    }
+)
+data.loc[[3, 50, 51], "score"] = np.nan
+grouped = data.groupby("date")["score"]
+
+
+def test_cross_sectional_rank_matches_groupby_rank():
+    codes = date_codes(data["date"])
+    for ascending in (True, False):
+        for pct in (False, True):
+            np.testing.assert_allclose(
+                cross_sectional_rank(data["score"], codes, ascending, pct),
+                grouped.rank(ascending=ascending, pct=pct),
+            )
+
+
+def test_add_cross_sectional_features_match_groupby():
+    df = add_cross_sectional_features(data.copy(), ["score"])
+    mean = grouped.transform("mean")
+    std = grouped.transform(lambda s: s.std(ddof=0))
+
+    np.testing.assert_allclose(df["score_cs_rank"], grouped.rank())
+    np.testing.assert_allclose(df["score_cs_pct"], grouped.rank(pct=True))
+    np.testing.assert_allclose(df["score_cs_demean"], data["score"] - mean)
+    np.testing.assert_allclose(df["score_cs_zscore"], (data["score"] - mean) / std)
+    with pytest.raises(ValueError):
+        add_cross_sectional_features(data.copy(), ["score"], transforms=("median",))
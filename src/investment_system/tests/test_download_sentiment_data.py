@@ -0,0 +1,249 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+import requests
+from investment_system.ingestion.download_sentiment_data import (
+    CHECKPOINT_FILE,
+    DailyLimitReached,
+    TokenBucket,
+    backfill_symbols_monthly,
+    checkpointed_months,
+    fetch_symbols_day,
+    open_checkpoints,
+)
+
+ARTICLES_PER_DAY = 2
+
+
+class MarketauxStub(BaseHTTPRequestHandler):
+    # every (symbol, day) has `articles` articles (`heavy` overrides it per
+    # symbol), plus one article per day
+    # mentioning all requested symbols; pages of `limit` articles; after
+    # `quota` requests the API answers 402 like Marketaux does when the
+    # daily limit is used up
+    articles = ARTICLES_PER_DAY
+    heavy = {}
+    quota = None
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        with self.lock:
+            MarketauxStub.requests += 1
+            over_quota = self.quota is not None and self.requests > self.quota
+        if over_quota:
+            self.send_response(402)
+            self.end_headers()
+            return
+
+        symbols = query["symbols"][0].split(",")
+        day = query["published_after"][0][:10]
+        data = [
+            {
+                "uuid": f"{symbol}-{day}-{i}",
+                "published_at": f"{day}T{i:02d}:00:00.000000Z",
+                "title": f"{symbol} news {i}",
+                "entities": [{"symbol": symbol, "sentiment_score": 0.01 * i}],
+            }
+            for symbol in symbols
+            for i in range(self.heavy.get(symbol, self.articles))
+        ]
+        if len(symbols) > 1:
+            data.append(
+                {
+                    "uuid": f"all-{day}",
+                    "published_at": f"{day}T23:00:00.000000Z",
+                    "title": "market news",
+                    "entities": [
+                        {"symbol": s, "sentiment_score": 0.5} for s in symbols
+                    ],
+                }
+            )
+        limit, page = int(query["limit"][0]), int(query["page"][0])
+        data = data[(page - 1) * limit : page * limit]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps({"data": data}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    MarketauxStub.articles = ARTICLES_PER_DAY
+    MarketauxStub.heavy = {}
+    MarketauxStub.quota = None
+    MarketauxStub.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MarketauxStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/news/all"
+    server.shutdown()
+    server.server_close()
+
+
+def backfill(stub_url, out_root, symbols, **kwargs):
+    return backfill_symbols_monthly(
+        symbols,
+        "2024-01-30",
+        "2024-02-02",
+        api_token="token",
+        out_root=out_root,
+        rate=1000.0,
+        base_url=stub_url,
+        **kwargs,
+    )
+
+
+def test_concurrent_backfill_writes_every_month(stub_url, tmp_path):
+    summary = backfill(stub_url, tmp_path, ["AAPL", "MSFT"], max_workers=4)
+
+    assert MarketauxStub.requests == 8
+    assert set(summary["status"]) == {"saved"}
+    for symbol in ("AAPL", "MSFT"):
+        for month, days in (("2024-01", 2), ("2024-02", 2)):
+            df = pd.read_parquet(tmp_path / symbol / f"{month}.parquet")
+            assert len(df) == days * ARTICLES_PER_DAY
+            assert set(df["requested_symbol"]) == {symbol}
+            assert df["published_at"].is_monotonic_increasing
+            assert list(df["sentiment_score"]) == [0.0, 0.01] * days
+
+
+def test_daily_limit_keeps_finished_months(stub_url, tmp_path):
+    MarketauxStub.quota = 3
+    summary = backfill(stub_url, tmp_path, ["AAPL"], max_workers=1)
+
+    status = dict(zip(summary["month"], summary["status"]))
+    assert status == {"2024-01": "saved", "2024-02": "incomplete"}
+    assert not (tmp_path / "AAPL" / "2024-02.parquet").exists()
+
+    MarketauxStub.quota = None
+    summary = backfill(stub_url, tmp_path, ["AAPL"], max_workers=1)
+    status = dict(zip(summary["month"], summary["status"]))
+    assert status == {"2024-01": "skipped_existing", "2024-02": "saved"}
+
+
+def test_resume_skips_checkpointed_days(stub_url, tmp_path):
+    MarketauxStub.quota = 3
+    backfill(stub_url, tmp_path, ["AAPL"], max_workers=1)
+    # 2 January days, 1 February day and the rejected request
+    assert MarketauxStub.requests == 4
+
+    MarketauxStub.quota = None
+    MarketauxStub.requests = 0
+    backfill(stub_url, tmp_path, ["AAPL"], max_workers=1)
+    assert MarketauxStub.requests == 1
+
+    df = pd.read_parquet(tmp_path / "AAPL" / "2024-02.parquet")
+    assert len(df) == 2 * ARTICLES_PER_DAY
+    assert df["published_at"].is_monotonic_increasing
+    with open_checkpoints(tmp_path / CHECKPOINT_FILE) as conn:
+        assert not checkpointed_months(conn)
+
+
+def test_crash_while_saving_month_keeps_it_resumable(stub_url, tmp_path, monkeypatch):
+    to_parquet = pd.DataFrame.to_parquet
+
+    def crash(self, path, *args, **kwargs):
+        if str(path).endswith(".tmp"):
+            Path(path).write_bytes(b"PAR1 truncated")
+            raise OSError("disk full")
+        return to_parquet(self, path, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", crash)
+    with pytest.raises(OSError):
+        backfill(stub_url, tmp_path, ["AAPL"], max_workers=1)
+    assert not (tmp_path / "AAPL" / "2024-01.parquet").exists()
+
+    monkeypatch.undo()
+    MarketauxStub.requests = 0
+    summary = backfill(stub_url, tmp_path, ["AAPL"], max_workers=1)
+    assert MarketauxStub.requests == 2
+    assert set(summary["status"]) == {"saved"}
+    df = pd.read_parquet(tmp_path / "AAPL" / "2024-01.parquet")
+    assert len(df) == 2 * ARTICLES_PER_DAY
+
+
+def test_local_daily_quota_stops_before_the_api_limit(stub_url, tmp_path):
+    summary = backfill(stub_url, tmp_path, ["AAPL"], max_workers=2, daily_quota=2)
+
+    assert MarketauxStub.requests == 2
+    assert set(summary["status"]) == {"saved", "incomplete"}
+
+    # a restart on the same UTC day continues from the stored count
+    summary = backfill(stub_url, tmp_path, ["AAPL"], max_workers=2, daily_quota=3)
+    assert MarketauxStub.requests == 3
+    assert set(summary["status"]) == {"skipped_existing", "incomplete"}
+
+
+def test_batched_backfill_splits_articles_per_symbol(stub_url, tmp_path):
+    symbols = ["AAPL", "MSFT", "NVDA"]
+    summary = backfill(stub_url, tmp_path, symbols, max_workers=2, batch_size=2)
+
+    # 4 days x 2 batches (AAPL+MSFT, NVDA) instead of 4 days x 3 symbols
+    assert MarketauxStub.requests == 8
+    assert set(summary["status"]) == {"saved"}
+    for symbol, shared in (("AAPL", 1), ("MSFT", 1), ("NVDA", 0)):
+        df = pd.read_parquet(tmp_path / symbol / "2024-02.parquet")
+        assert len(df) == 2 * (ARTICLES_PER_DAY + shared)
+        assert set(df["requested_symbol"]) == {symbol}
+        assert all(symbol in entities for entities in df["entities_json"])
+
+
+def test_batched_fetch_follows_full_pages(stub_url):
+    MarketauxStub.articles = 15
+    day = pd.Timestamp("2024-02-01", tz="UTC").to_pydatetime()
+    with requests.Session() as session:
+        frames = fetch_symbols_day(
+            session,
+            ["AAPL", "MSFT"],
+            day,
+            day + pd.Timedelta(days=1),
+            api_token="token",
+            base_url=stub_url,
+        )
+
+    # 31 articles: a full page of 20 and a second one of 11
+    assert MarketauxStub.requests == 2
+    assert len(frames["AAPL"]) == len(frames["MSFT"]) == 16
+    assert set(frames["MSFT"]["page"]) == {1, 2}
+
+
+def test_batched_fetch_pages_past_a_dominant_symbol(stub_url):
+    # AAPL alone fills the first two pages, MSFT only shows up on the third
+    MarketauxStub.heavy = {"AAPL": 45}
+    day = pd.Timestamp("2024-02-01", tz="UTC").to_pydatetime()
+    with requests.Session() as session:
+        frames = fetch_symbols_day(
+            session,
+            ["AAPL", "MSFT"],
+            day,
+            day + pd.Timedelta(days=1),
+            api_token="token",
+            base_url=stub_url,
+        )
+
+    assert MarketauxStub.requests == 3
+    assert len(frames["AAPL"]) == 20
+    assert len(frames["MSFT"]) == ARTICLES_PER_DAY + 1
+    assert set(frames["MSFT"]["page"]) == {3}
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=50.0, burst=1, daily_quota=11)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.monotonic() - start >= 10 / 50.0 * 0.9
+    with pytest.raises(DailyLimitReached):
+        bucket.acquire()
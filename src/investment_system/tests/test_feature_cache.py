@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+import pytest
+from investment_system.features.feature_cache import (
+    cached_price_features,
+    evict_feature_cache,
+)
+from investment_system.features.price_features import add_price_features
+
+WINDOWS = (1, 5, 20)
+
+
+@pytest.fixture
+def data(make_prices):
+    return make_prices({"AAPL": 40, "MSFT": 30}, seed=11)
+
+
+def test_cached_price_features_match_and_store_columns(data, tmp_path):
+    expected = add_price_features(data, WINDOWS)
+    first = cached_price_features(data, WINDOWS, cache_dir=tmp_path)
+    second = cached_price_features(data, WINDOWS, cache_dir=tmp_path)
+
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+    (entry,) = tmp_path.iterdir()
+    assert {path.stem for path in entry.iterdir()} == set(
+        expected.columns[len(data.columns) :]
+    )
+
+    subset = cached_price_features(
+        data, WINDOWS, columns=["distance_from_high_5"], cache_dir=tmp_path
+    )
+    pd.testing.assert_frame_equal(subset, expected[subset.columns])
+
+
+def test_cache_key_depends_on_prices_windows_and_validation(data, tmp_path):
+    cached_price_features(data, WINDOWS, cache_dir=tmp_path)
+    cached_price_features(data, (5,), cache_dir=tmp_path)
+    changed = data.assign(close=data["close"] * 1.001)
+    cached_price_features(changed, WINDOWS, cache_dir=tmp_path)
+    cached_price_features(data, WINDOWS, validate="off", cache_dir=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 4
+
+
+def test_evict_feature_cache_removes_least_recently_used(data, tmp_path):
+    cached_price_features(data, WINDOWS, cache_dir=tmp_path)
+    (oldest,) = tmp_path.iterdir()
+    os.utime(oldest, (0, 0))
+    cached_price_features(data, (5,), cache_dir=tmp_path)
+    newest = next(path for path in tmp_path.iterdir() if path != oldest)
+    max_bytes = sum(path.stat().st_size for path in newest.iterdir())
+
+    assert evict_feature_cache(tmp_path, max_bytes) == [oldest]
+    assert list(tmp_path.iterdir()) == [newest]
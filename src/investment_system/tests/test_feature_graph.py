@@ -0,0 +1,36 @@
+import pytest
+from investment_system.features.feature_graph import resolve_features
+from investment_system.features.price_features import price_feature_columns
+
+WINDOWS = (5, 20)
+
+
+def test_resolve_features_lists_inputs_first():
+    resolved = resolve_features(["px_log_return_ratio_20"], WINDOWS)
+    assert resolved == [
+        "close",
+        "log_return",
+        "log_return_moments_20",
+        "px_log_return_mean_20",
+        "px_log_return_volatility_20",
+        "px_log_return_ratio_20",
+    ]
+
+
+def test_resolve_features_skips_unrelated_kernels():
+    resolved = resolve_features(["distance_from_high_5", "sentiment_score"], WINDOWS)
+    assert resolved == [
+        "close",
+        "rolling_high_5_close",
+        "distance_from_high_5",
+        "sentiment_data",
+        "sentiment_score",
+    ]
+    assert not any("moments" in node for node in resolved)
+
+
+def test_resolve_features_covers_price_columns():
+    resolved = resolve_features(price_feature_columns(WINDOWS), WINDOWS)
+    assert set(price_feature_columns(WINDOWS)) <= set(resolved)
+    with pytest.raises(KeyError):
+        resolve_features(["distance_from_high_7"], WINDOWS)
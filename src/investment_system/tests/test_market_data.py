@@ -0,0 +1,267 @@
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+from investment_system.ingestion.market_data import (
+    NoDataError,
+    categorize_prices,
+    RateLimiter,
+    cached_source,
+    fetch_stooq_symbol,
+    fetch_stooq_symbols,
+    fetch_stooq_universe,
+    load_prices,
+    parse_stooq_csv,
+    partition_path,
+    price_source,
+    save_prices,
+    update_prices,
+    validate_prices,
+)
+
+BARS = [
+    "2024-01-03,11,12,10,11.5,1000",
+    "2024-01-02,10,11,9,10.5,900",
+    "2024-01-04,12,13,11,12.5,1100",
+]
+START = date(2024, 1, 1)
+END = date(2024, 1, 3)
+
+
+class StooqStub(BaseHTTPRequestHandler):
+    # aapl.us fails once with 503 before answering, msft.us always returns
+    # "No data", anything unknown is a 404
+    calls = {}
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        symbol = query["s"][0]
+        self.calls[symbol] = self.calls.get(symbol, 0) + 1
+        if symbol == "aapl.us" and self.calls[symbol] == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if symbol in ("aapl.us", "nvda.us", "pkn"):
+            d1, d2 = query["d1"][0], query["d2"][0]
+            rows = [b for b in BARS if d1 <= b[:10].replace("-", "") <= d2]
+            body = "Date,Open,High,Low,Close,Volume\n" + "\n".join(rows)
+            if not rows:
+                body = "No data"
+        elif symbol == "msft.us":
+            body = "No data"
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StooqStub.calls = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StooqStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/q/d/l/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_stooq_symbol_parses_csv(stub_url):
+    df = fetch_stooq_symbol("NVDA", "us", START, END, base_url=stub_url)
+    assert list(df["date"].astype(str)) == ["2024-01-02", "2024-01-03"]
+    assert set(df["symbol"]) == {"NVDA"}
+    assert set(df["market"]) == {"us"}
+
+
+def test_fetch_stooq_symbols_retries_and_reports_failures(stub_url):
+    symbols = [("AAPL", "us"), ("MSFT", "us"), ("PKN", "pl"), ("XYZ", "us")]
+    prices, failures = fetch_stooq_symbols(
+        symbols, START, END, max_workers=4, rate=100, base_url=stub_url, backoff=0.01
+    )
+
+    assert list(prices["symbol"].unique()) == ["AAPL", "PKN"]
+    assert StooqStub.calls["aapl.us"] == 2
+    assert list(failures["symbol"]) == ["MSFT", "XYZ"]
+    assert "No data" in failures.loc[0, "error"]
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = RateLimiter(rate=50)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.wait("http://a.example/x")
+    assert time.monotonic() - started >= 4 / 50
+
+    started = time.monotonic()
+    limiter.wait("http://b.example/x")
+    assert time.monotonic() - started < 1 / 50
+
+
+def test_update_prices_fetches_only_new_bars(stub_url, tmp_path):
+    path = tmp_path / "prices.parquet"
+    cfg = {
+        "dates": {"start": "2024-01-01", "end": "2024-01-03"},
+        "universe": {"us": ["NVDA"], "pl": []},
+    }
+    df, n_new = update_prices(path, cfg, base_url=stub_url)
+    assert n_new == 2
+
+    cfg["dates"]["end"] = "2024-01-05"
+    cfg["universe"]["pl"] = ["PKN"]
+    df, n_new = update_prices(path, cfg, base_url=stub_url)
+
+    assert n_new == 1 + 3
+    assert not df.duplicated(["date", "symbol", "market"]).any()
+    assert list(df.groupby("symbol")["date"].max().astype(str)) == ["2024-01-04"] * 2
+    df, n_new = update_prices(path, cfg, base_url=stub_url)
+    assert n_new == 0
+
+
+def test_partitioned_prices_roundtrip_with_filters(tmp_path):
+    prices = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-02", "2024-01-03"] * 3),
+            "open": 10.0,
+            "high": 11.0,
+            "low": 9.0,
+            "close": 10.5,
+            "volume": 100,
+            "symbol": ["AAPL", "AAPL", "NVDA", "NVDA", "PKN", "PKN"],
+            "market": ["us", "us", "us", "us", "pl", "pl"],
+        }
+    )
+    root = tmp_path / "prices"
+    save_prices(prices, root)
+    assert partition_path(root, "pl", "PKN").exists()
+
+    df = load_prices(root)
+    assert df["symbol"].dtype == "category"
+    pd.testing.assert_frame_equal(
+        df.sort_values(["symbol", "date"]).reset_index(drop=True)[prices.columns],
+        categorize_prices(prices.copy()),
+        check_dtype=False,
+    )
+    subset = load_prices(
+        root, symbols=["NVDA", "PKN"], start="2024-01-03", columns=["date", "close"]
+    )
+    assert list(subset.columns) == ["date", "close"]
+    assert len(subset) == 2
+
+    save_prices(prices[prices["symbol"] != "PKN"], root)
+    assert not partition_path(root, "pl", "PKN").exists()
+    assert set(load_prices(root)["symbol"]) == {"AAPL", "NVDA"}
+
+
+def test_validate_prices_report_and_modes():
+    prices = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-03"]),
+            "open": [10.0, 10.0, 10.0],
+            "high": [11.0, 9.5, 11.0],
+            "low": [9.0, 9.0, 9.0],
+            "close": [10.5, 10.5, 10.5],
+            "volume": [100, -1, 100],
+            "symbol": "AAPL",
+            "market": "us",
+        }
+    )
+    report = validate_prices(prices, mode="report")
+
+    assert {rule: list(rows) for rule, rows in report.items()} == {
+        "negative_volume": [1],
+        "high_below_open_close": [1],
+        "duplicate_key": [2],
+    }
+    assert validate_prices(prices.drop([1, 2]), mode="report") == {}
+    assert validate_prices(prices, mode="skip") == {}
+    with pytest.raises(ValueError, match="Volume"):
+        validate_prices(prices)
+    with pytest.raises(ValueError):
+        validate_prices(prices, mode="fast")
+
+
+def test_csv_mirror_cached_and_replayed_offline(tmp_path):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    header = "Date,Open,High,Low,Close,Volume\n"
+    (mirror / "nvda.us.csv").write_text(header + "\n".join(BARS))
+    (mirror / "pkn.csv").write_text(header + "\n".join(BARS))
+    cfg = {
+        "dates": {"start": "2024-01-01", "end": "2024-01-03"},
+        "universe": {"us": ["NVDA"], "pl": ["PKN"]},
+        "data": {"source": "stooq_csv", "csv_dir": mirror, "cache_dir": tmp_path},
+    }
+    df = fetch_stooq_universe(cfg)
+    assert len(df) == 4
+    assert (tmp_path / "pl" / "pkn.parquet").exists()
+
+    # an updated mirror file invalidates its cached series
+    fixed = [BARS[0], "2024-01-02,10,11,9,9.5,900", BARS[2]]
+    (mirror / "pkn.csv").write_text(header + "\n".join(fixed))
+    updated = fetch_stooq_universe(cfg)
+    assert updated.loc[updated["symbol"] == "PKN", "close"].tolist() == [9.5, 11.5]
+    (mirror / "pkn.csv").write_text(header + "\n".join(BARS))
+    pd.testing.assert_frame_equal(fetch_stooq_universe(cfg), df)
+
+    for path in mirror.iterdir():
+        path.unlink()
+    cfg["data"] = {"source": "replay", "cache_dir": tmp_path}
+    pd.testing.assert_frame_equal(fetch_stooq_universe(cfg), df)
+
+    # ranges inside the cached one are filtered in memory (incremental runs)
+    replay = price_source(cfg)
+    assert len(replay("PKN", "pl", date(2024, 1, 3), date(2024, 1, 3))) == 1
+
+    cfg["dates"]["end"] = "2024-01-06"
+    with pytest.raises(RuntimeError, match="not cached"):
+        fetch_stooq_universe(cfg)
+
+
+def test_http_cache_fetches_only_new_days(stub_url, tmp_path):
+    symbols = [("NVDA", "us")]
+    first, _ = fetch_stooq_symbols(
+        symbols, START, END, base_url=stub_url, cache_dir=tmp_path
+    )
+    assert StooqStub.calls == {"nvda.us": 1}
+    again, _ = fetch_stooq_symbols(
+        symbols, START, END, base_url=stub_url, cache_dir=tmp_path
+    )
+    assert StooqStub.calls == {"nvda.us": 1}
+    pd.testing.assert_frame_equal(again, first)
+
+    later, _ = fetch_stooq_symbols(
+        symbols, START, date(2024, 1, 4), base_url=stub_url, cache_dir=tmp_path
+    )
+    assert StooqStub.calls == {"nvda.us": 2}
+    assert len(later) == 3
+
+
+def test_cache_does_not_store_no_data(tmp_path):
+    calls = []
+
+    def limited(symbol, market, start, end):
+        calls.append((start, end))
+        if len(calls) == 1:
+            raise NoDataError("Exceeded the daily hits limit")
+        return parse_stooq_csv(
+            "Date,Open,High,Low,Close,Volume\n" + "\n".join(BARS), symbol, market
+        )
+
+    source = cached_source(tmp_path, limited)
+    with pytest.raises(NoDataError):
+        source("NVDA", "us", START, END)
+    assert not (tmp_path / "us").exists()
+    assert len(source("NVDA", "us", START, END)) == 2
+    assert len(source("NVDA", "us", START, END)) == 2
+    assert len(calls) == 2
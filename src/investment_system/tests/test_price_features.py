@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+import pytest
+from investment_system.features.price_features import (
+    add_price_features,
+    is_sorted,
+    price_feature_columns,
+    price_feature_state,
+    rolling_extrema,
+    rolling_moments,
+    sort_data,
+    symbol_blocks,
+    update_price_features,
+)
+
+WINDOWS = (1, 5, 20)
+rng = np.random.default_rng(7)
+
+
+@pytest.fixture
+def data(make_prices):
+    df = make_prices({"AAPL": 60, "MSFT": 3, "NVDA": 45}, seed=7)
+    return df[["symbol", "date", "open", "close"]]
+
+
+def test_price_features_match_groupby_reference(data):
+    df = add_price_features(data, WINDOWS)
+    grouped = df.groupby("symbol")
+    log_ret = grouped["close"].transform(lambda s: np.log(s / s.shift(1)))
+
+    assert np.allclose(df["log_return"], log_ret, equal_nan=True)
+    for window in WINDOWS:
+        shifted = log_ret.groupby(df["symbol"]).shift(1)
+        mean = shifted.groupby(df["symbol"]).transform(
+            lambda s: s.rolling(window).mean()
+        )
+        vol = shifted.groupby(df["symbol"]).transform(
+            lambda s: s.rolling(window).std(ddof=0)
+        )
+        high = grouped["close"].transform(lambda s: s.rolling(window).max())
+        low = grouped["close"].transform(lambda s: s.rolling(window).min())
+
+        assert np.allclose(df[f"px_log_return_mean_{window}"], mean, equal_nan=True)
+        assert np.allclose(
+            df[f"px_log_return_volatility_{window}"], vol, equal_nan=True
+        )
+        assert np.allclose(df[f"rolling_high_{window}_close"], high, equal_nan=True)
+        assert np.allclose(df[f"rolling_min_{window}_close"], low, equal_nan=True)
+
+
+def test_price_features_keep_column_order(data):
+    df = add_price_features(data, (5,))
+    assert list(df.columns[-8:]) == [
+        "log_return",
+        "px_log_return_mean_5",
+        "px_log_return_volatility_5",
+        "px_log_return_ratio_5",
+        "rolling_high_5_close",
+        "distance_from_high_5",
+        "rolling_min_5_close",
+        "distance_from_min_5",
+    ]
+
+
+def test_price_features_inplace_writes_into_caller_frame(data):
+    df = data.copy()
+    out = add_price_features(df, WINDOWS, inplace=True)
+
+    assert out is df
+    assert is_sorted(df)
+    assert "distance_from_high_20" in df.columns
+    pd.testing.assert_frame_equal(out, add_price_features(data, WINDOWS))
+
+
+def test_price_features_do_not_modify_input(data):
+    df = sort_data(data)
+    columns = list(df.columns)
+    add_price_features(df, WINDOWS)
+    assert list(df.columns) == columns
+
+
+def test_price_features_validate_modes(data):
+    full = add_price_features(data, WINDOWS, validate="full")
+    pd.testing.assert_frame_equal(
+        full, add_price_features(data, WINDOWS, validate="off")
+    )
+    pd.testing.assert_frame_equal(
+        full, add_price_features(data, WINDOWS, validate="sample")
+    )
+    with pytest.raises(ValueError):
+        add_price_features(data, WINDOWS, validate="fast")
+
+
+def test_rolling_extrema_match_pandas_rolling():
+    values = rng.normal(100, 5, 700)
+    values[[10, 400]] = np.nan
+    symbols = pd.Series(np.repeat(["A", "B", "C"], [300, 2, 398]))
+    _, position = symbol_blocks(symbols)
+    windows = (1, 3, 64, 252, 300)
+
+    highs = rolling_extrema(values, position, windows, np.maximum)
+    lows = rolling_extrema(values, position, windows, np.minimum)
+    grouped = pd.Series(values).groupby(symbols)
+    for window in windows:
+        high = grouped.transform(lambda s: s.rolling(window).max())
+        low = grouped.transform(lambda s: s.rolling(window).min())
+        np.testing.assert_array_equal(highs[window], high.to_numpy())
+        np.testing.assert_array_equal(lows[window], low.to_numpy())
+
+
+def test_update_price_features_matches_full_recompute(data):
+    full = add_price_features(data, WINDOWS)
+    last_date = data["date"].max()
+    history = data[data["date"] < last_date - pd.Timedelta(days=3)]
+    new_rows = data[data["date"] >= last_date - pd.Timedelta(days=3)]
+
+    state = price_feature_state(history, WINDOWS)
+    features, state = update_price_features(state, new_rows, WINDOWS)
+
+    expected = full[full["date"] >= last_date - pd.Timedelta(days=3)]
+    pd.testing.assert_frame_equal(features, expected.reset_index(drop=True))
+    assert state.groupby("symbol").size().max() == max(WINDOWS) + 1
+
+    with pytest.raises(ValueError):
+        update_price_features(state, new_rows, WINDOWS)
+
+
+def test_rolling_moments_match_pandas_rolling():
+    values = rng.normal(0.001, 0.02, 900)
+    values[[0, 300, 301, 650]] = np.nan
+    values[500:520] = 0.0
+    symbols = pd.Series(np.repeat(["A", "B", "C"], [300, 2, 598]))
+    _, position = symbol_blocks(symbols)
+    windows = (1, 5, 20, 252, 300)
+
+    moments = rolling_moments(values, position, windows)
+    grouped = pd.Series(values).groupby(symbols)
+    for window in windows:
+        mean = grouped.transform(lambda s: s.rolling(window).mean())
+        std = grouped.transform(lambda s: s.rolling(window).std(ddof=0))
+        np.testing.assert_allclose(moments[window][0], mean, rtol=1e-9, atol=1e-15)
+        np.testing.assert_allclose(moments[window][1], std, rtol=1e-9, atol=1e-15)
+
+    # windows longer than the whole (short) history stay NaN
+    short = values[:150]
+    _, position = symbol_blocks(pd.Series(["A"] * len(short)))
+    windows = (20, 60, 120, 180, 252)
+    moments = rolling_moments(short, position, windows)
+    for window in windows:
+        mean = pd.Series(short).rolling(window).mean()
+        std = pd.Series(short).rolling(window).std(ddof=0)
+        np.testing.assert_allclose(moments[window][0], mean, rtol=1e-9, atol=1e-15)
+        np.testing.assert_allclose(moments[window][1], std, rtol=1e-9, atol=1e-15)
+
+    # a low-variance window far from the first return is not flat
+    tight = np.array([np.nan, -0.05, 0.004464, 0.004463])
+    _, position = symbol_blocks(pd.Series(["A"] * len(tight)))
+    mean, std = rolling_moments(tight, position, (2,))[2]
+    np.testing.assert_allclose(mean[3], 0.0044635, rtol=1e-9)
+    np.testing.assert_allclose(std[3], 5e-7, rtol=1e-6)
+
+
+def test_price_features_float32_storage(data):
+    wide = add_price_features(data, WINDOWS)
+    narrow = add_price_features(data, WINDOWS, dtype="float32")
+
+    feature_cols = list(wide.columns[len(data.columns) :])
+    assert (narrow[feature_cols].dtypes == "float32").all()
+    assert narrow["close"].dtype == data["close"].dtype
+    np.testing.assert_allclose(
+        narrow[feature_cols].to_numpy("float64"),
+        wide[feature_cols].to_numpy(),
+        rtol=1e-5,
+        atol=1e-6,
+    )
+    assert (narrow["distance_from_high_20"].dropna() <= 0).all()
+    assert (narrow["distance_from_min_20"].dropna() >= 0).all()
+
+    with pytest.raises(ValueError):
+        add_price_features(data, WINDOWS, dtype="float16")
+
+
+def test_price_features_float32_keeps_per_date_order():
+    n_symbols, periods = 800, 80
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (periods, n_symbols)), axis=0))
+    panel = pd.DataFrame(
+        {
+            "symbol": np.tile([f"S{i:04d}" for i in range(n_symbols)], periods),
+            "date": np.repeat(pd.date_range("2024-01-01", periods=periods), n_symbols),
+            "open": close.ravel(),
+            "close": close.ravel(),
+        }
+    )
+    wide = add_price_features(panel, (20, 60))
+    narrow = add_price_features(panel, (20, 60), dtype="float32")
+
+    for col in ["distance_from_high_20", "distance_from_min_60"]:
+        frame = pd.DataFrame(
+            {"date": wide["date"], "wide": wide[col], "narrow": narrow[col]}
+        ).dropna()
+        frame = frame.sort_values(["date", "wide"], kind="stable")
+        step = frame.groupby("date")["narrow"].diff()
+        assert not (step < 0).any()
+
+
+def test_price_features_without_intermediates(data):
+    full = add_price_features(data, WINDOWS)
+    df = add_price_features(data, WINDOWS, keep_intermediates=False)
+
+    expected = price_feature_columns(WINDOWS, keep_intermediates=False)
+    assert list(df.columns) == list(data.columns) + expected
+    assert not any(col.startswith("rolling_") for col in df.columns)
+    pd.testing.assert_frame_equal(df, full[df.columns])
+
+
+def test_price_features_requested_columns_only(data):
+    columns = ["distance_from_min_5", "px_log_return_ratio_20"]
+    full = add_price_features(data, WINDOWS)
+    df = add_price_features(data, WINDOWS, columns=columns)
+
+    assert list(df.columns) == list(data.columns) + columns
+    pd.testing.assert_frame_equal(df, full[df.columns])
+    with pytest.raises(KeyError):
+        add_price_features(data, WINDOWS, columns=["distance_from_high_7"])
+
+
+def test_price_features_parallel_matches_serial(data):
+    serial = add_price_features(data, WINDOWS)
+    pd.testing.assert_frame_equal(serial, add_price_features(data, WINDOWS, n_jobs=2))
+    pd.testing.assert_frame_equal(serial, add_price_features(data, WINDOWS, n_jobs=-1))
+    with pytest.raises(ValueError):
+        add_price_features(data, WINDOWS, n_jobs=0)
+
+
+def test_price_features_parallel_column_subset(data):
+    for columns in (["px_log_return_mean_20"], ["log_return", "distance_from_min_5"]):
+        serial = add_price_features(data, WINDOWS, columns=columns)
+        parallel = add_price_features(data, WINDOWS, columns=columns, n_jobs=3)
+        assert list(parallel.columns) == list(data.columns) + columns
+        pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_price_features_accept_categorical_symbols(data):
+    categorical = data.astype({"symbol": "category"})
+    df = add_price_features(categorical, WINDOWS)
+
+    assert df["symbol"].dtype == "category"
+    assert is_sorted(df)
+    pd.testing.assert_frame_equal(
+        df.astype({"symbol": data["symbol"].dtype}), add_price_features(data, WINDOWS)
+    )
@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pandas as pd
+from investment_system.ingestion.sentiment_data import (
+    NEWS_COLUMNS,
+    _get_sentiment_for_requested_symbol,
+    _parse_entities,
+    build_sentiment_pipeline,
+    entity_sentiment_table,
+    extract_sentiment,
+    load_all_symbols_news,
+    load_symbol_news,
+)
+
+ARTICLES = pd.DataFrame(
+    {
+        "published_at": pd.to_datetime(["2024-01-02T10:00:00"] * 6, utc=True),
+        "requested_symbol": ["AAPL", "AAPL", "MSFT", "MSFT", "AAPL", "NVDA"],
+        "entities_json": [
+            json.dumps(
+                [
+                    {"symbol": "MSFT", "sentiment_score": -0.2, "name": "Microsoft"},
+                    {"symbol": "AAPL", "sentiment_score": 0.4, "highlights": [{}]},
+                ]
+            ),
+            json.dumps([{"symbol": "AAPL", "sentiment_score": None}]),
+            json.dumps([{"symbol": "MSFT", "sentiment_score": 1}]),
+            "[]",
+            None,
+            json.dumps([{"symbol": "AAPL", "sentiment_score": 0.3}]),
+        ],
+    }
+)
+
+MONTHS = ["2024-01", "2024-02"]
+SYMBOLS = ["AAPL", "MSFT"]
+
+
+def write_news(root):
+    frames = []
+    for symbol in SYMBOLS:
+        for month in MONTHS:
+            df = pd.DataFrame(
+                {
+                    "requested_symbol": symbol,
+                    "uuid": [f"{symbol}-{month}-{i}" for i in range(3)],
+                    "published_at": pd.to_datetime(
+                        [f"{month}-0{i + 1}T10:00:00" for i in range(3)], utc=True
+                    ),
+                    "title": "title",
+                    "snippet": "snippet",
+                    "entities_json": [
+                        json.dumps([{"symbol": symbol, "sentiment_score": 0.1 * i}])
+                        for i in range(3)
+                    ],
+                }
+            )
+            (root / symbol).mkdir(exist_ok=True)
+            df.to_parquet(root / symbol / f"{month}.parquet", index=False)
+            frames.append(df)
+    (root / "_checkpoints.sqlite").write_bytes(b"")
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_load_all_symbols_news_reads_every_file_once(tmp_path):
+    expected = write_news(tmp_path)
+
+    pd.testing.assert_frame_equal(load_all_symbols_news(tmp_path), expected)
+    # sentiment_score is not in these (older) files and is skipped
+    projected = load_all_symbols_news(tmp_path, columns=NEWS_COLUMNS, max_workers=2)
+    pd.testing.assert_frame_equal(projected, expected[NEWS_COLUMNS[:3]])
+
+
+def test_load_symbol_news(tmp_path):
+    expected = write_news(tmp_path)
+
+    df = load_symbol_news(tmp_path, "MSFT", columns=NEWS_COLUMNS)
+    msft = expected[expected["requested_symbol"] == "MSFT"].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, msft[NEWS_COLUMNS[:3]])
+    assert load_symbol_news(tmp_path, "NVDA").empty
+
+
+def test_build_sentiment_pipeline(tmp_path):
+    write_news(tmp_path)
+    df = build_sentiment_pipeline(tmp_path)
+
+    assert len(df) == len(SYMBOLS) * len(MONTHS) * 3
+    assert list(df.columns) == ["symbol", "date", "sentiment_score"]
+    assert df["sentiment_score"].max() == 0.2
+
+
+def reference_sentiment(df):
+    return [
+        _get_sentiment_for_requested_symbol(_parse_entities(entities), symbol)
+        for entities, symbol in zip(df["entities_json"], df["requested_symbol"])
+    ]
+
+
+def test_extract_sentiment_matches_per_row_parsing():
+    expected = np.array(reference_sentiment(ARTICLES), dtype="float64")
+    np.testing.assert_array_equal(
+        extract_sentiment(ARTICLES)["sentiment_score"], expected
+    )
+
+    # invalid JSON falls back to per-row parsing
+    broken = ARTICLES.copy()
+    broken.loc[3, "entities_json"] = "{not json"
+    np.testing.assert_array_equal(
+        extract_sentiment(broken)["sentiment_score"], expected
+    )
+
+
+def test_extract_sentiment_uses_flattened_scores():
+    df = ARTICLES.assign(sentiment_score=[0.9, np.nan, np.nan, np.nan, 0.1, np.nan])
+    scores = extract_sentiment(df)["sentiment_score"].to_numpy()
+    np.testing.assert_array_equal(scores, [0.9, np.nan, 1.0, np.nan, 0.1, np.nan])
+
+
+def test_entity_sentiment_table():
+    table = entity_sentiment_table(ARTICLES["entities_json"])
+    assert list(table["article"]) == [0, 0, 1, 2, 5]
+    assert list(table["symbol"]) == ["MSFT", "AAPL", "AAPL", "MSFT", "AAPL"]
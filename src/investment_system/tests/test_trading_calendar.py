@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from investment_system.common.trading_calendar import (
+    market_calendars,
+    panel_to_frame,
+    price_panel,
+    rebalance_mask,
+    trading_calendar,
+)
+from investment_system.strategies.ml_strategy import rebalance_day
+
+
+@pytest.fixture
+def data(make_prices):
+    df = make_prices(
+        {"AAPL": 30, "MSFT": 20, "PKO": 25},
+        seed=3,
+        markets={"AAPL": "us", "MSFT": "us", "PKO": "pl"},
+    )
+    # two US trading days on which the Polish market is closed
+    closed = df["date"].isin(pd.bdate_range("2024-01-04", periods=2))
+    df = df[~(closed & (df["symbol"] == "PKO"))]
+    return df.reset_index(drop=True)
+
+
+def test_calendars_match_unique_sorted_dates(data):
+    expected = data["date"].drop_duplicates().sort_values().to_numpy()
+    np.testing.assert_array_equal(trading_calendar(data["date"]).to_numpy(), expected)
+
+    calendars = market_calendars(data)
+    assert set(calendars) == {"pl", "us"}
+    assert len(calendars["us"]) == 30
+    assert len(calendars["pl"]) == 23
+
+
+def test_rebalance_mask_matches_every_nth_date(data):
+    for holding in (1, 3, 7):
+        dates = pd.Series(data["date"].drop_duplicates().sort_values().to_numpy())
+        expected = data["date"].isin(set(dates.iloc[::holding])).to_numpy()
+        np.testing.assert_array_equal(rebalance_mask(data["date"], holding), expected)
+
+    calendar = trading_calendar(data["date"])
+    df = rebalance_day(data, 5, calendar)
+    np.testing.assert_array_equal(df["rebalance_day"], rebalance_mask(df["date"], 5))
+    with pytest.raises(ValueError):
+        rebalance_mask(data["date"], 0)
+
+
+def test_price_panel_roundtrip(data):
+    panel = price_panel(data, ["close"])
+
+    assert panel.mask.shape == (30, 3)
+    assert list(panel.symbols) == ["AAPL", "MSFT", "PKO"]
+    assert panel.mask.sum() == len(data)
+    assert np.isnan(panel.values["close"][~panel.mask]).all()
+
+    expected = data.sort_values(["symbol", "date"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        panel_to_frame(panel), expected[["symbol", "date", "close"]]
+    )
+
+
+def test_price_panel_on_market_calendar(data):
+    pl = market_calendars(data)["pl"]
+    panel = price_panel(data, ["close"], calendar=pl)
+
+    assert panel.mask.shape == (23, 3)
+    assert panel.mask[:, 2].all()
+    with pytest.raises(ValueError):
+        price_panel(pd.concat([data, data.iloc[:1]]), ["close"])